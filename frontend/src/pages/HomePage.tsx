@@ -6,7 +6,7 @@ import { Tooltip, TooltipContent, TooltipProvider, TooltipTrigger } from '../com
 import { Button } from '../components/ui/button';
 import { useNavigate } from 'react-router-dom';
 import { ActiveAgentsTab, ActiveFlowsTab, RecentExecutionsTab } from '../components/dashboard';
-import { getAgentRunsCountLast7Days, getAgentRunsForMetrics, getRecentAgentRuns, type AgentRunMetricsDoc } from '../services/dashboardApi';
+import { getRunAnalytics, getRecentAgentRuns } from '../services/dashboardApi';
 import type { AgentRunDoc } from '../services/agentRunApi';
 import { getAgents } from '../services/agentApi';
 import type { AgentDoc } from '../types/agent.types';
@@ -18,56 +18,6 @@ interface DashboardMetrics {
   totalCost: number;
 }
 
-/**
- * Calculate success rate from agent runs
- */
-function calculateSuccessRate(runs: AgentRunMetricsDoc[]): number {
-  if (runs.length === 0) return 0;
-  const successCount = runs.filter(
-    (run) => run.status === 'Success' || run.status === 'success'
-  ).length;
-  return (successCount / runs.length) * 100;
-}
-
-/**
- * Calculate average runtime from agent runs
- */
-function calculateAvgRuntime(runs: AgentRunMetricsDoc[]): number {
-  const validRuns = runs.filter(
-    (run) => run.start_time && run.end_time
-  );
-
-  if (validRuns.length === 0) return 0;
-
-  const totalMs = validRuns.reduce((sum, run) => {
-    try {
-      const start = new Date(run.start_time!);
-      const end = new Date(run.end_time!);
-      
-      if (isNaN(start.getTime()) || isNaN(end.getTime())) {
-        return sum;
-      }
-
-      const diff = end.getTime() - start.getTime();
-      return diff >= 0 ? sum + diff : sum;
-    } catch {
-      return sum;
-    }
-  }, 0);
-
-  return totalMs / validRuns.length;
-}
-
-/**
- * Calculate total cost from agent runs
- */
-function calculateTotalCost(runs: AgentRunMetricsDoc[]): number {
-  return runs.reduce((sum, run) => {
-    const cost = run.cost;
-    return sum + (typeof cost === 'number' && !isNaN(cost) ? cost : 0);
-  }, 0);
-}
-
 /**
  * Format duration in milliseconds to human-readable string
  */
@@ -136,9 +86,8 @@ export function HomePage() {
     async function fetchAllData() {
       try {
         // Fetch all data in parallel
-        const [totalRuns, runsData, agentsData, recentRuns] = await Promise.all([
-          getAgentRunsCountLast7Days(),
-          getAgentRunsForMetrics(),
+        const [analytics, agentsData, recentRuns] = await Promise.all([
+          getRunAnalytics({ days: 7 }),
           getAgents({
             status: 'active',
             limit: 10,
@@ -147,16 +96,13 @@ export function HomePage() {
           getRecentAgentRuns(),
         ]);
 
-        // Process metrics
-        const successRate = calculateSuccessRate(runsData);
-        const avgRuntime = calculateAvgRuntime(runsData);
-        const totalCost = calculateTotalCost(runsData);
-
+        // Metrics are aggregated server-side; durations come back in seconds
+        const totals = analytics?.totals;
         setMetrics({
-          totalRuns,
-          successRate,
-          avgRuntime,
-          totalCost,
+          totalRuns: totals?.runs ?? 0,
+          successRate: totals?.success_rate ?? 0,
+          avgRuntime: (totals?.avg_duration ?? 0) * 1000,
+          totalCost: totals?.cost ?? 0,
         });
 
         // Process agents
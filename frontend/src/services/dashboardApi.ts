@@ -1,78 +1,61 @@
-import { db } from '@/lib/frappe-sdk';
+import { db, call } from '@/lib/frappe-sdk';
 import { doctype } from '@/data/doctypes';
 import { handleFrappeError } from '@/lib/frappe-error';
-import { fetchDocCount } from './utilsApi';
 import { AgentRunDoc } from './agentRunApi';
 
 /**
- * Agent Run document for metrics calculation
+ * Aggregated run metrics returned by the run analytics API
+ * Durations are in seconds
  */
-export interface AgentRunMetricsDoc {
-  status?: string;
-  start_time?: string | null;
-  end_time?: string | null;
-  cost?: number | null;
+export interface RunAnalyticsMetrics {
+  runs: number;
+  success_runs: number;
+  failed_runs: number;
+  success_rate: number;
+  avg_duration: number;
+  p50_duration: number;
+  p95_duration: number;
+  input_tokens: number;
+  output_tokens: number;
+  total_tokens: number;
+  cost: number;
 }
 
-
-/**
- * Get date filters for last 7 days
- */
-function getLast7DaysFilters(): Array<[string, string, unknown]> {
-  const now = new Date();
-  const sevenDaysAgo = new Date(now);
-  sevenDaysAgo.setDate(sevenDaysAgo.getDate() - 7);
-  
-  // Format dates as YYYY-MM-DD HH:mm:ss
-  const formatDate = (date: Date): string => {
-    const year = date.getFullYear();
-    const month = String(date.getMonth() + 1).padStart(2, '0');
-    const day = String(date.getDate()).padStart(2, '0');
-    const hours = String(date.getHours()).padStart(2, '0');
-    const minutes = String(date.getMinutes()).padStart(2, '0');
-    const seconds = String(date.getSeconds()).padStart(2, '0');
-    return `${year}-${month}-${day} ${hours}:${minutes}:${seconds}`;
-  };
-
-  return [
-    ['creation', '>=', formatDate(sevenDaysAgo)],
-    ['creation', '<=', formatDate(now)],
-  ];
+export interface RunAnalytics {
+  from_date: string;
+  to_date: string;
+  granularity: 'Hourly' | 'Daily';
+  as_of?: string | null;
+  totals: RunAnalyticsMetrics;
+  series: Array<RunAnalyticsMetrics & { period_start: string }>;
+  breakdown: Array<RunAnalyticsMetrics & Record<string, unknown>>;
 }
 
-/**
- * Fetch the count of agent runs in the last 7 days
- */
-export async function getAgentRunsCountLast7Days(): Promise<number> {
-  try {
-    const filters = getLast7DaysFilters();
-    const count = await fetchDocCount(doctype['Agent Run'], filters);
-    return count ?? 0;
-  } catch (error) {
-    handleFrappeError(error, 'Error fetching agent runs count for last 7 days');
-    return 0;
-  }
+export interface RunAnalyticsParams {
+  days?: number;
+  from_date?: string;
+  to_date?: string;
+  granularity?: 'Hourly' | 'Daily';
+  group_by?: 'agent' | 'model' | 'provider';
+  agent?: string;
+  model?: string;
+  provider?: string;
 }
 
 /**
- * Fetch all agent runs for metrics calculation (last 7 days)
- * Returns runs with status, start_time, end_time, and total_cost fields
+ * Fetch server-side run analytics (last 7 days by default)
+ * Metrics come from pre-aggregated rollups instead of raw Agent Run rows
  */
-export async function getAgentRunsForMetrics(): Promise<AgentRunMetricsDoc[]> {
+export async function getRunAnalytics(params: RunAnalyticsParams = {}): Promise<RunAnalytics> {
   try {
-    const filters = getLast7DaysFilters();
-    
-    // Fetch all runs (use a very high limit or fetch in batches)
-    const runs = await db.getDocList(doctype['Agent Run'], {
-      fields: ['status', 'start_time', 'end_time', 'cost'],
-      filters: filters as any,
-      limit: 10000, // High limit to get all runs
-      orderBy: { field: 'creation', order: 'desc' },
+    const result = await call.get('huf.ai.run_analytics.get_run_analytics', {
+      days: 7,
+      granularity: 'Hourly',
+      ...params,
     });
-    
-    return runs as AgentRunMetricsDoc[];
+    return result.message as RunAnalytics;
   } catch (error) {
-    handleFrappeError(error, 'Error fetching agent runs for metrics');
+    handleFrappeError(error, 'Error fetching run analytics');
   }
 }
 
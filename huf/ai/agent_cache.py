@@ -0,0 +1,118 @@
+import json
+import threading
+
+import frappe
+
+INVALIDATION_CHANNEL = "huf:compiled_agent_invalidate"
+
+# (site, agent_name) -> (fingerprint, compiled SDK Agent)
+_compiled_agents = {}
+_lock = threading.Lock()
+_listener = None
+
+
+def get_compiled_agent(agent_name):
+    """
+    Return the compiled SDK Agent for agent_name, building it only when needed.
+
+    The compiled agent (tools, serialized tool schemas, instructions and model
+    settings) is kept per worker process and reused while the `modified`
+    timestamps of the Agent, its AI Provider, tool functions and MCP servers
+    are unchanged. Saves also evict entries through Redis pub/sub.
+    """
+    _ensure_listener()
+
+    key = (frappe.local.site, agent_name)
+    fingerprint = _get_fingerprint(agent_name)
+    cached = _compiled_agents.get(key)
+    if cached and cached[0] == fingerprint:
+        return cached[1]
+
+    from huf.ai.agent_integration import AgentManager
+
+    agent = AgentManager(agent_name).create_agent()
+    with _lock:
+        _compiled_agents[key] = (fingerprint, agent)
+    return agent
+
+
+def _get_fingerprint(agent_name):
+    """Single query returning the modified timestamps the compiled agent depends on."""
+    row = frappe.db.sql(
+        """
+        SELECT
+            a.modified,
+            (SELECT p.modified FROM `tabAI Provider` p WHERE p.name = a.provider),
+            (SELECT MAX(f.modified)
+                FROM `tabAgent Tool` t
+                JOIN `tabAgent Tool Function` f ON f.name = t.tool
+                WHERE t.parent = a.name AND t.parenttype = 'Agent'),
+            (SELECT MAX(s.modified)
+                FROM `tabAgent MCP Server` m
+                JOIN `tabMCP Server` s ON s.name = m.mcp_server
+                WHERE m.parent = a.name AND m.parenttype = 'Agent')
+        FROM `tabAgent` a
+        WHERE a.name = %s
+        """,
+        (agent_name,),
+    )
+    return tuple(str(v) for v in row[0]) if row else None
+
+
+def evict_compiled_agent(site, agent_name=None):
+    """Drop cached agents for a site (all of them when agent_name is None)."""
+    with _lock:
+        for key in list(_compiled_agents):
+            if key[0] == site and (agent_name is None or key[1] == agent_name):
+                _compiled_agents.pop(key, None)
+
+
+def publish_agent_cache_invalidation(doc=None, method=None):
+    """doc_events hook: tell every worker to drop compiled agents affected by doc."""
+    agent_name = doc.name if doc is not None and doc.doctype == "Agent" else None
+    site = frappe.local.site
+    evict_compiled_agent(site, agent_name)
+    try:
+        frappe.cache().publish(
+            INVALIDATION_CHANNEL,
+            json.dumps({"site": site, "agent": agent_name}),
+        )
+    except Exception:
+        frappe.log_error(frappe.get_traceback(), "Agent Cache Invalidation Error")
+
+
+def _ensure_listener():
+    """Start the per-process pub/sub listener thread once."""
+    global _listener
+    if _listener is not None and _listener.is_alive():
+        return
+
+    with _lock:
+        if _listener is not None and _listener.is_alive():
+            return
+        try:
+            pubsub = frappe.cache().pubsub(ignore_subscribe_messages=True)
+            pubsub.subscribe(INVALIDATION_CHANNEL)
+        except Exception:
+            # Without a listener, the fingerprint check alone keeps entries fresh
+            return
+
+        _listener = threading.Thread(
+            target=_listen, args=(pubsub,), name="huf-agent-cache", daemon=True
+        )
+        _listener.start()
+
+
+def _listen(pubsub):
+    try:
+        for message in pubsub.listen():
+            try:
+                data = json.loads(message["data"])
+                evict_compiled_agent(data.get("site"), data.get("agent"))
+            except Exception:
+                continue
+    except Exception:
+        # Connection lost: messages may have been missed, so start clean.
+        # A new listener is started on the next get_compiled_agent() call.
+        with _lock:
+            _compiled_agents.clear()
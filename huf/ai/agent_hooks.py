@@ -6,54 +6,115 @@ from uuid import uuid4
 from frappe.utils import now_datetime
 import json
 
+from huf.huf.doctype.agent_trigger.agent_trigger import NON_COALESCIBLE_EVENTS
+
 CACHE_KEY = "huf:doc_event_agents"
+CACHE_VERSION_KEY = "huf:doc_event_agents_version"
+
+# site -> (version, {(reference_doctype, doc_event): [trigger, ...]})
+_trigger_index = {}
+
+
+def get_doc_event_agents(event: str, doctype: str = None):
+    """Return Doc Event triggers for an event, optionally limited to one DocType."""
+    index = get_doc_event_index()
+    if doctype:
+        return index.get((doctype, event), [])
+    return [t for (_, e), triggers in index.items() if e == event for t in triggers]
+
+
+def get_doc_event_index():
+    """
+    Per-process index of (reference_doctype, doc_event) -> Agent Trigger rows.
+
+    The index is tagged with a version stored in Redis and revalidated once per
+    request/job, so hooks firing for unrelated DocTypes cost a dict lookup.
+    """
+    index = getattr(frappe.local, "huf_doc_event_index", None)
+    if index is not None:
+        return index
+
+    cache = frappe.cache()
+    version = cache.get_value(CACHE_VERSION_KEY)
+    if not version:
+        version = frappe.generate_hash(length=10)
+        cache.set_value(CACHE_VERSION_KEY, version)
+
+    site = frappe.local.site
+    cached = _trigger_index.get(site)
+    if cached and cached[0] == version:
+        index = cached[1]
+    else:
+        triggers = cache.get_value(f"{CACHE_KEY}:{version}")
+        if triggers is None:
+            triggers = _load_doc_event_triggers()
+            cache.set_value(f"{CACHE_KEY}:{version}", triggers, expires_in_sec=86400)
 
+        index = {}
+        for t in triggers:
+            index.setdefault((t["reference_doctype"], t["doc_event"]), []).append(t)
+        _trigger_index[site] = (version, index)
 
-def get_doc_event_agents(event: str):
-    """Fetch & cache Doc Event triggers (Agent Trigger doctype)."""
+    frappe.local.huf_doc_event_index = index
+    return index
+
+
+def _load_doc_event_triggers():
+    """Fetch enabled Doc Event triggers (Agent Trigger doctype) with their agent settings."""
     if not frappe.db.exists("DocType", "Agent Trigger"):
         return []
 
-    cached = frappe.cache().hget(CACHE_KEY, f"doc_event:{event}")
-    if cached:
-        return frappe.parse_json(cached)
-
-    triggers = frappe.get_list(
+    triggers = frappe.get_all(
         "Agent Trigger",
         filters={
             "trigger_type": "Doc Event",
             "disabled": 0,
-            "doc_event": event
         },
-        fields=["name", "agent", "reference_doctype", "doc_event", "condition", "prompt_field"] 
+        fields=[
+            "name", "agent", "reference_doctype", "doc_event", "condition", "prompt_field",
+            "coalesce_events", "max_batch_size"
+        ]
     )
+    if not triggers:
+        return []
+
+    agents = {
+        a.name: a
+        for a in frappe.get_all(
+            "Agent",
+            filters={"name": ["in", list({t.agent for t in triggers})]},
+            fields=["name", "instructions", "provider", "model"],
+        )
+    }
 
     result = []
     for t in triggers:
-        try:
-            agent_doc = frappe.get_doc("Agent", t["agent"])
-            result.append({
-                "name": t["name"],
-                "agent": t["agent"],
-                "reference_doctype": t.get("reference_doctype"),
-                "doc_event": t.get("doc_event"),
-                "condition": t.get("condition"),
-                "prompt_field": t.get("prompt_field"), 
-                "instructions": getattr(agent_doc, "instructions", None),
-                "provider": getattr(agent_doc, "provider", None),
-                "model": getattr(agent_doc, "model", None),
-            })
-        except Exception:
-            frappe.log_error(frappe.get_traceback(), f"Agent Trigger load failed: {t.get('name')}")
+        agent_doc = agents.get(t["agent"])
+        if not agent_doc or not t.get("reference_doctype") or not t.get("doc_event"):
+            frappe.log_error(f"Agent Trigger skipped: {t.get('name')}", "Agent Trigger load failed")
+            continue
+        result.append({
+            "name": t["name"],
+            "agent": t["agent"],
+            "reference_doctype": t.get("reference_doctype"),
+            "doc_event": t.get("doc_event"),
+            "condition": t.get("condition"),
+            "prompt_field": t.get("prompt_field"), 
+            "coalesce_events": t.get("coalesce_events"),
+            "max_batch_size": t.get("max_batch_size"),
+            "instructions": agent_doc.instructions,
+            "provider": agent_doc.provider,
+            "model": agent_doc.model,
+        })
 
-    frappe.cache().hset(CACHE_KEY, f"doc_event:{event}", frappe.as_json(result))
     return result
 
 
 def clear_doc_event_agents_cache(doc=None, method=None):
-    """Clear cache when Agent changes."""
+    """Invalidate the trigger index in every process by bumping its version."""
+    frappe.local.huf_doc_event_index = None
     try:
-        frappe.cache().delete_key(CACHE_KEY)
+        frappe.cache().set_value(CACHE_VERSION_KEY, frappe.generate_hash(length=10))
     except Exception:
         pass
 
@@ -62,12 +123,7 @@ def run_hooked_agents(doc, method=None, *args, **kwargs):
     if not method:
         return
 
-    agents = get_doc_event_agents(method)
-    matching = [
-        a for a in agents
-        if a.get("reference_doctype") == doc.doctype and a.get("doc_event") == method
-    ]
-
+    matching = get_doc_event_agents(method, doc.doctype)
     if not matching:
         return
 
@@ -87,6 +143,11 @@ def run_hooked_agents(doc, method=None, *args, **kwargs):
             except Exception as e:
                 frappe.log_error(f"Condition error in Agent {agent.get('agent')}: {e}")
                 continue
+
+        if agent.get("coalesce_events") and method not in NON_COALESCIBLE_EVENTS:
+            _buffer_doc_event(agent, doc, method)
+            continue
+
         enqueue(
             run_agent_for_doc,
             queue="long",
@@ -104,6 +165,136 @@ def run_hooked_agents(doc, method=None, *args, **kwargs):
         )
 
 
+def _buffer_doc_event(trigger, doc, method):
+    """Collect a matching document; flushed as one batch job once the transaction commits."""
+    batches = getattr(frappe.local, "huf_doc_event_batches", None)
+    if not batches:
+        batches = frappe.local.huf_doc_event_batches = {}
+        frappe.db.after_commit.add(flush_doc_event_batches)
+        frappe.db.after_rollback.add(discard_doc_event_batches)
+
+    batch = batches.setdefault(
+        (trigger["name"], method),
+        {"trigger": trigger, "reference_doctype": doc.doctype, "doc_names": []},
+    )
+    if doc.name not in batch["doc_names"]:
+        batch["doc_names"].append(doc.name)
+
+
+def flush_doc_event_batches():
+    """Enqueue one job per trigger and chunk of buffered document references."""
+    batches = getattr(frappe.local, "huf_doc_event_batches", None)
+    frappe.local.huf_doc_event_batches = None
+    if not batches:
+        return
+
+    for (_trigger_name, method), batch in batches.items():
+        trigger = batch["trigger"]
+        doc_names = batch["doc_names"]
+        size = trigger.get("max_batch_size") or 20
+
+        for start in range(0, len(doc_names), size):
+            enqueue(
+                run_agent_for_docs,
+                queue="long",
+                job_id=f"run-agent-batch-{trigger['agent']}-{batch['reference_doctype']}-{method}-{uuid4()}",
+                reference_doctype=batch["reference_doctype"],
+                doc_names=doc_names[start:start + size],
+                agent_name=trigger["agent"],
+                instructions=trigger.get("instructions"),
+                event_name=method,
+                provider=trigger.get("provider"),
+                model=trigger.get("model"),
+                initiating_user=frappe.session.user,
+                channel_id="doc_event",
+                prompt_field=trigger.get("prompt_field")
+            )
+
+
+def discard_doc_event_batches():
+    """Drop buffered events of a rolled back transaction."""
+    frappe.local.huf_doc_event_batches = None
+
+
+def _clean_doc_for_prompt(doc):
+    clean_doc = doc.copy() if isinstance(doc, dict) else doc.as_dict()
+    for key in ["_user_tags", "_comments", "_assign", "_liked_by", "docstatus", "password"]:
+        clean_doc.pop(key, None)
+    return clean_doc
+
+
+def _get_external_id(agent_name, initiating_user, doc=None):
+    try:
+        agent_doc = frappe.get_doc("Agent", agent_name)
+        if getattr(agent_doc, "persist_user_history", False):
+            return initiating_user or (doc and (doc.get("owner") or doc.get("modified_by"))) or "unknown_user"
+        return f"shared:{agent_name}"
+    except Exception:
+        return initiating_user or f"shared:{agent_name}"
+
+
+def run_agent_for_docs(reference_doctype, doc_names, agent_name, instructions, event_name, provider, model, initiating_user=None, channel_id=None, prompt_field=None):
+    """Background worker to run an agent once for a batch of documents from coalesced Doc Events"""
+
+    try:
+        # Full documents, child tables included, as the per-document path passes
+        docs = []
+        missing = []
+        for name in doc_names:
+            try:
+                docs.append(frappe.get_doc(reference_doctype, name).as_dict())
+            except frappe.DoesNotExistError:
+                missing.append(name)
+
+        prompt = f"""
+            You are an automation agent triggered by a Frappe document event.
+
+            Event: {event_name}
+            This run covers {len(doc_names)} documents of the same DocType.
+            Handle each document in turn using the available tools with these exact identifiers:
+            reference_doctype = "{reference_doctype}"
+            reference_names   = {json.dumps(doc_names)}
+        """
+
+        custom_instructions = {
+            d.name: d.get(prompt_field) for d in docs if prompt_field and d.get(prompt_field)
+        }
+        if custom_instructions:
+            prompt += f"""
+
+            USER REQUESTS:
+            The user has provided the following specific requests per document:
+            {json.dumps(custom_instructions, indent=2, default=str)}
+
+            Please prioritize these requests over your general instructions.
+            """
+        else:
+            prompt += f"""
+
+            Instructions:
+            {instructions or "Perform the required action for this event."}
+        """
+
+        json_string = json.dumps([_clean_doc_for_prompt(d) for d in docs], indent=2, default=str)
+        prompt += f"""
+
+            Documents Data (Context):
+            ```json
+            {json_string}
+            ```
+            """
+        if missing:
+            prompt += f"""
+            These documents no longer exist: {json.dumps(missing)}
+            """
+
+        external_id = _get_external_id(agent_name, initiating_user)
+        run_agent_sync(agent_name, prompt, provider, model, channel_id=channel_id or "doc_event", external_id=external_id)
+
+    except Exception:
+        frappe.log_error(frappe.get_traceback(), "Hook Triggered Agent Error")
+
+
 def run_agent_for_doc(doc, agent_name, instructions, event_name, provider, model, include_doc=False, initiating_user=None, channel_id=None, prompt_field=None):
     """Background worker to run an agent when a Doc Event triggers"""
 
@@ -140,10 +331,7 @@ def run_agent_for_doc(doc, agent_name, instructions, event_name, provider, model
         """
 
         try:
-            clean_doc = doc.copy() if isinstance(doc, dict) else doc.as_dict()
-            for key in ["_user_tags", "_comments", "_assign", "_liked_by", "docstatus", "password"]:
-                clean_doc.pop(key, None)
-            
+            clean_doc = _clean_doc_for_prompt(doc)
             json_string = json.dumps(clean_doc, indent=2, default=str)
             prompt += f"""
             
@@ -155,17 +343,8 @@ def run_agent_for_doc(doc, agent_name, instructions, event_name, provider, model
         except Exception:
             pass
 
-        external_id = None
         channel = channel_id or "doc_event"
-
-        try:
-            agent_doc = frappe.get_doc("Agent", agent_name)
-            if getattr(agent_doc, "persist_user_history", False):
-                external_id = initiating_user or doc.get("owner") or doc.get("modified_by") or "unknown_user"
-            else:
-                external_id = f"shared:{agent_name}"
-        except Exception:
-            external_id = initiating_user or f"shared:{agent_name}"
+        external_id = _get_external_id(agent_name, initiating_user, doc)
 
         run_agent_sync(agent_name, prompt, provider, model, channel_id=channel, external_id=external_id)
 
@@ -21,6 +21,10 @@ from .tool_functions import (
 )
 from .conversation_manager import ConversationManager
 from .run import RunProvider
+from .agent_cache import get_compiled_agent
+from .turn_writer import TurnWriter
+from .stream_broker import coalesce_deltas
+from .tool_serializer import serialize_tools
 from huf.ai.knowledge.context_builder import build_knowledge_context, inject_knowledge_context
 
 
@@ -270,9 +274,19 @@ class AgentManager:
         # Set max_turns from agent configuration
         agent.max_turns = self.agent_doc.max_turns or 20
 
+        # Bound concurrent tool calls per turn (1 keeps sequential execution)
+        agent.max_parallel_tool_calls = (
+            (self.agent_doc.max_parallel_tool_calls or 4)
+            if self.agent_doc.get("enable_parallel_tool_calls")
+            else 1
+        )
+
         if not hasattr(agent, "tools") or agent.tools is None:
             agent.tools = []
 
+        # Tool schemas are static for a compiled agent; serialize them once
+        agent.serialized_tools = serialize_tools(agent.tools)
+
         return agent
 
 def safe_commit():
@@ -287,6 +301,15 @@ def safe_commit():
         else:
             raise
 
+def increment_agent_run_stats(agent_name, start_time=None):
+    """Bump Agent.total_run and last_run in place; no aggregate over Agent Run."""
+    frappe.db.sql("""
+        UPDATE `tabAgent`
+        SET total_run = COALESCE(total_run, 0) + 1,
+            last_run = GREATEST(COALESCE(last_run, %(start)s), %(start)s)
+        WHERE name = %(agent)s
+    """, {"agent": agent_name, "start": start_time or now_datetime()})
+
 def process_tool_call(agent_run, conversation, name=None, args=None, result=None, error=None, is_output=False, tool_call_id=None):
     """Process tool call - handle requests (insert) and outputs (update) separately"""
     try:
@@ -534,19 +557,10 @@ def run_agent_sync(
     
     try:
         frappe.db.set_value("Agent Run", run_doc.name, "status", "Started", update_modified=True)
+        increment_agent_run_stats(agent_name, run_doc.start_time)
         safe_commit()
 
-        total_runs = frappe.db.count("Agent Run", filters={"agent": agent_name})
-        last_run_time = frappe.db.get_value("Agent Run", {"agent": agent_name}, "start_time", order_by="start_time DESC")
-
-        frappe.db.set_value("Agent", agent_name, {
-            "total_run": total_runs,
-            "last_run": last_run_time
-        },update_modified=False)
-        safe_commit()
-
-        manager = AgentManager(agent_name)
-        agent = manager.create_agent()
+        agent = get_compiled_agent(agent_name)
 
         # Build knowledge context for mandatory sources
         knowledge_context = None
@@ -645,17 +659,45 @@ def run_agent_sync(
             loop.close()
 
         client_side_tool_calls = []
-
-        for item in getattr(result, "new_items", []):
+        writer = TurnWriter(conversation, run_doc.name, conv_manager.session_id, user=conv_manager.external_id)
+        new_items = getattr(result, "new_items", [])
+
+        # Resolve tool metadata for the whole turn in two queries
+        tool_names = list({
+            getattr(item.raw_item, "name", None)
+            for item in new_items if item.type == "tool_call_item"
+        } - {None})
+        tool_types = {}
+        mcp_servers = {}
+        if tool_names:
+            tool_types = dict(frappe.get_all(
+                "Agent Tool Function",
+                filters={"tool_name": ["in", tool_names]},
+                fields=["tool_name", "types"],
+                as_list=True,
+            ))
+            mcp_servers = dict(frappe.get_all(
+                "MCP Server Tool",
+                filters={"tool_name": ["in", tool_names], "enabled": 1},
+                fields=["tool_name", "parent"],
+                as_list=True,
+            ))
+
+        for item in new_items:
             if item.type == "tool_call_item":
                 raw = item.raw_item  
-                tool_call_id = log_tool_call(run_doc, conversation, raw, is_output=False)
-
                 tool_name = getattr(raw, "name", "Unknown Tool")
                 tool_args = getattr(raw, "arguments", "{}")
+
+                tool_call_id = writer.add_tool_call(
+                    tool_name,
+                    args=tool_args,
+                    call_id=getattr(raw, "id", None),
+                    is_mcp_tool=1 if tool_name in mcp_servers else 0,
+                    mcp_server=mcp_servers.get(tool_name),
+                )
                 
-                tool_type = frappe.db.get_value("Agent Tool Function", {"tool_name": tool_name}, "types")
-                if tool_type == "Client Side Tool":
+                if tool_types.get(tool_name) == "Client Side Tool":
                     call_id = getattr(raw, "id", None)
                      
                     client_side_tool_calls.append({
@@ -669,18 +711,15 @@ def run_agent_sync(
 
                 msg_content = f"Requesting Tool: {tool_name}\nArguments: {tool_args}"
                 
-                message_doc = conv_manager.add_message(
-                    conversation, 
+                writer.add_message(
                     role="agent", 
                     content=msg_content, 
                     provider=agent_doc.provider, 
                     model=agent_doc.model, 
                     agent=agent_name, 
-                    run_name=run_doc.name,
                     kind="Tool Call",
                     tool_call_id=tool_call_id 
                 )
-                safe_commit()
 
             elif item.type == "tool_call_output_item":
                 raw = item.raw_item
@@ -689,25 +728,20 @@ def run_agent_sync(
                 except Exception:
                     tool_result = raw.get("output")
 
-                updated_tool_call_id = log_tool_call(run_doc, conversation, raw, tool_result=tool_result, is_output=True)
+                updated_tool_call_id, tool_call = writer.complete_tool_call(
+                    call_id=raw.get("call_id") if raw else None,
+                    result=tool_result,
+                )
 
                 if updated_tool_call_id:
-                    # Get tool call doc to check status
-                    tool_call_doc = frappe.get_doc("Agent Tool Call", updated_tool_call_id)
-                    tool_status = tool_call_doc.status or "Completed"
-                    tool_name = tool_call_doc.tool or "Unknown Tool"
+                    tool_status = tool_call.get("status") or "Completed"
+                    tool_name = tool_call.get("tool") or "Unknown Tool"
 
-                    message_name = frappe.db.get_value("Agent Message", {"tool_calll": updated_tool_call_id}, "name")
+                    message_name = writer.get_tool_call_message(updated_tool_call_id)
 
                     if message_name:
-                        msg_doc = frappe.get_doc("Agent Message", message_name)
-                        
                         result_str = json.dumps(tool_result) if not isinstance(tool_result, str) else tool_result
-                        new_content = msg_doc.content + f"\n\n**Tool Result:**\n{result_str}"
-                        
-                        msg_doc.content = new_content
-                        msg_doc.kind = "Tool Result"
-                        msg_doc.save(ignore_permissions=True)
+                        writer.append_tool_result(message_name, result_str)
 
                     # Emit socket event for tool call completed/failed
                     # Always emit, even if message not found (e.g., for image generation which creates its own message)
@@ -729,21 +763,17 @@ def run_agent_sync(
                             message_name = image_message
                     
                     event_type = "tool_call_completed" if tool_status == "Completed" else "tool_call_failed"
-                    frappe.publish_realtime(
-                        event=f'conversation:{conversation.name}',
-                        message={
-                            "type": event_type,
-                            "conversation_id": conversation.name,
-                            "agent_run_id": run_doc.name,
-                            "tool_call_id": updated_tool_call_id,
-                            "message_id": message_name or None,
-                            "tool_name": tool_name,
-                            "tool_status": tool_status,
-                            "tool_result": tool_result if tool_status == "Completed" else None,
-                            "error": tool_call_doc.error_message if tool_status == "Failed" else None,
-                        },
-                        user=frappe.session.user,
-                    )
+                    writer.publish({
+                        "type": event_type,
+                        "conversation_id": conversation.name,
+                        "agent_run_id": run_doc.name,
+                        "tool_call_id": updated_tool_call_id,
+                        "message_id": message_name or None,
+                        "tool_name": tool_name,
+                        "tool_status": tool_status,
+                        "tool_result": tool_result if tool_status == "Completed" else None,
+                        "error": tool_call.get("error_message") if tool_status == "Failed" else None,
+                    })
         
         final_output = getattr(result, "final_output", str(result))
         usage = getattr(result, "usage", None)
@@ -785,24 +815,25 @@ def run_agent_sync(
             except Exception as e:
                 frappe.log_error(f"Failed to update conversation metrics: {str(e)}")
             # -----------------------------------
-            frappe.db.set_value("Agent Run", run_doc.name, {
-                "input_tokens": input_tokens,
-                "output_tokens": output_tokens,
-                "cached_tokens": cached_tokens,
-                "cost": cost
-            })
+            writer.set_run_values(
+                input_tokens=input_tokens,
+                output_tokens=output_tokens,
+                cached_tokens=cached_tokens,
+                cost=cost,
+            )
 
-        conv_manager.add_message(conversation, "agent", final_output, agent_doc.provider, agent_doc.model, agent_name, run_doc.name)
+        writer.add_message("agent", final_output, agent_doc.provider, agent_doc.model, agent_name)
 
-        frappe.db.set_value("Agent Run", run_doc.name, {
-            "status": "Success",
-            "response": final_output,
-            "prompt": prompt,
-            "model": agent_doc.model,
-            "provider": agent_doc.provider,
-            "end_time": now_datetime()
-        }, update_modified=True)
-        safe_commit()
+        writer.set_run_values(
+            status="Success",
+            response=final_output,
+            prompt=prompt,
+            model=agent_doc.model,
+            provider=agent_doc.provider,
+            response_cache_hit=1 if getattr(result, "cache_hit", False) else 0,
+            end_time=now_datetime(),
+        )
+        writer.flush()
 
         if context_strategy == "Summarize":
             current_history_len = len(history)
@@ -825,7 +856,7 @@ def run_agent_sync(
             "response": final_output,
             "client_side_tool_calls": client_side_tool_calls,
             "structured": structured,
-            "provider": manager.agent_doc.provider,
+            "provider": agent_doc.provider,
             "agent_run_id": run_doc.name,
             "conversation_id": conversation.name,
             "session_id": conv_manager.session_id
@@ -873,8 +904,9 @@ async def run_agent_stream(
     Yields:
         dict: Streaming chunks with structure:
             - type: "delta" | "complete" | "tool_call" | "error"
-            - content: str (for delta)
-            - full_response: str (accumulated response)
+            - content: str (for delta; new text only, several provider deltas
+              may be coalesced into one chunk)
+            - full_response: str (accumulated response, on complete only)
             - tool_call: dict (for tool_call type)
             - error: str (for error type)
     """
@@ -942,20 +974,12 @@ async def run_agent_stream(
         run_doc.insert()
         conv_manager.add_message(conversation, "user", prompt, provider, model, agent_name, run_doc.name)
         run_doc.db_set("start_time", now_datetime())
-        safe_commit()
         
         # Update agent stats
-        total_runs = frappe.db.count("Agent Run", filters={"agent": agent_name})
-        last_run_time = frappe.db.get_value("Agent Run", {"agent": agent_name}, "start_time", order_by="start_time DESC")
-        
-        frappe.db.set_value("Agent", agent_name, {
-            "total_run": total_runs,
-            "last_run": last_run_time
-        },update_modified=False)
+        increment_agent_run_stats(agent_name, run_doc.start_time)
         safe_commit()
         
-        manager = AgentManager(agent_name)
-        agent = manager.create_agent()
+        agent = get_compiled_agent(agent_name)
         
         context = {
             "channel": channel_id,
@@ -1044,15 +1068,15 @@ async def run_agent_stream(
         context["conversation_history"] = history
         
         # Stream from provider
-        full_response = ""
+        response_parts = []
         try:
-            stream = RunProvider.run_stream(agent, enhanced_prompt, provider, model, context)
+            stream = coalesce_deltas(RunProvider.run_stream(agent, enhanced_prompt, provider, model, context))
             
             async for chunk in stream:
                 chunk_type = chunk.get("type")
                 
                 if chunk_type == "delta":
-                    full_response = chunk.get("full_response", full_response)
+                    response_parts.append(chunk.get("content") or "")
                     yield chunk
                 
                 elif chunk_type == "tool_call":
@@ -1087,7 +1111,8 @@ async def run_agent_stream(
                     yield chunk
                 
                 elif chunk_type == "complete":
-                    full_response = chunk.get("full_response", full_response)
+                    full_response = chunk.get("full_response") or "".join(response_parts)
+                    chunk["full_response"] = full_response
                     usage = chunk.get("usage", {})
                     frappe.log_error(f"Stream Usage Received: {usage} Type: {type(usage)}", "Debug Stream Usage")
                     
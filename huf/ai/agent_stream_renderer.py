@@ -14,6 +14,15 @@ from frappe.website.page_renderers.base_renderer import BaseRenderer
 from werkzeug.wrappers import Response
 
 from huf.ai.agent_integration import run_agent_stream
+from huf.ai.stream_broker import (
+	can_read_stream,
+	format_event_id,
+	get_stream_key,
+	parse_event_id,
+	start_stream_job,
+	tail_stream,
+	TERMINAL_TYPES,
+)
 
 
 class AgentStreamRenderer(BaseRenderer):
@@ -22,6 +31,13 @@ class AgentStreamRenderer(BaseRenderer):
 	Routes:
 	- `/huf/stream/<agent_name>` - SSE endpoint that streams agent responses
 	- `/huf/stream` - HTML page with EventSource client for testing
+
+	By default the agent runs inside the request. With `transport=worker` (or
+	`huf_stream_transport: "worker"` in site config) generation runs in a
+	background job and this endpoint only tails its Redis stream (see
+	huf.ai.stream_broker). Worker frames have an event id, and a reconnect
+	carrying `Last-Event-ID` (or `last_event_id`) replays the buffered chunks
+	after it instead of starting a new run; inline streams cannot be resumed.
 	"""
 
 	def can_render(self) -> bool:
@@ -53,6 +69,10 @@ class AgentStreamRenderer(BaseRenderer):
 
 	def _render_agent_stream(self, agent_name: str):
 		"""Generate SSE stream for agent response."""
+		last_event_id = frappe.get_request_header("Last-Event-ID") or frappe.form_dict.get("last_event_id")
+		if last_event_id:
+			return self._render_resumed_stream(last_event_id)
+
 		# Get prompt from query parameters or request body
 		prompt = frappe.form_dict.get("prompt") or frappe.form_dict.get("message", "")
 		
@@ -128,6 +148,12 @@ class AgentStreamRenderer(BaseRenderer):
 			except Exception:
 				pass
 		
+		transport = frappe.form_dict.get("transport") or frappe.conf.get("huf_stream_transport") or "inline"
+		if transport == "worker":
+			return self._render_worker_stream(
+				agent_name, prompt, provider, model, channel_id, external_id, conversation_id
+			)
+		
 		# Create async generator wrapper
 		def stream_generator() -> Generator[str, None, None]:
 			"""Wrapper to convert async generator to sync generator for Werkzeug Response."""
@@ -158,7 +184,7 @@ class AgentStreamRenderer(BaseRenderer):
 						yield f"data: {json.dumps(chunk)}\n\n"
 						
 						# Check if stream is complete
-						if chunk.get("type") in ("complete", "error"):
+						if chunk.get("type") in TERMINAL_TYPES:
 							break
 					except StopAsyncIteration:
 						break
@@ -189,6 +215,71 @@ class AgentStreamRenderer(BaseRenderer):
 		
 		return response
 
+	def _render_worker_stream(self, agent_name, prompt, provider, model, channel_id, external_id, conversation_id):
+		"""Run the agent in a background job and relay its Redis stream as SSE."""
+		stream_id = start_stream_job(
+			agent_name=agent_name,
+			prompt=prompt,
+			provider=provider,
+			model=model,
+			channel_id=channel_id,
+			external_id=external_id,
+			conversation_id=conversation_id,
+		)
+		started = {"type": "stream_started", "stream_id": stream_id}
+		return self._relay_stream(stream_id, "0-0", first_frame=f"data: {json.dumps(started)}\n\n")
+
+	def _render_resumed_stream(self, last_event_id: str):
+		"""Replay a worker stream after last_event_id, then keep tailing it."""
+		stream_id, entry_id = parse_event_id(last_event_id)
+		# 204 tells EventSource to stop reconnecting: the stream is gone, or the
+		# client already received its final chunk. Never start a new run here.
+		if not stream_id or not can_read_stream(stream_id):
+			return Response(status=204)
+
+		latest = frappe.cache().xrevrange(get_stream_key(stream_id), count=1)
+		if latest:
+			latest_id, fields = latest[0]
+			latest_id = latest_id.decode() if isinstance(latest_id, bytes) else latest_id
+			chunk = json.loads(fields.get(b"data") or fields.get("data"))
+			if latest_id == entry_id and chunk.get("type") in TERMINAL_TYPES:
+				return Response(status=204)
+
+		return self._relay_stream(stream_id, entry_id)
+
+	def _relay_stream(self, stream_id: str, last_id: str, first_frame: str = None):
+		"""SSE response relaying a Redis stream from last_id, one event id per frame."""
+		# Resolve Redis handles now; the generator runs after the request context is torn down
+		cache = frappe.cache()
+		key = get_stream_key(stream_id)
+
+		def stream_generator() -> Generator[str, None, None]:
+			if first_frame:
+				yield first_frame
+			try:
+				for entry_id, chunk in tail_stream(cache, key, last_id):
+					if chunk is None:
+						# SSE comment keeps proxies from closing an idle connection
+						yield ": keep-alive\n\n"
+						continue
+					if entry_id is None:
+						yield f"data: {json.dumps(chunk)}\n\n"
+						continue
+					yield f"id: {format_event_id(stream_id, entry_id)}\ndata: {json.dumps(chunk)}\n\n"
+			except Exception as e:
+				error_data = {"type": "error", "error": f"Stream relay error: {str(e)}"}
+				yield f"data: {json.dumps(error_data)}\n\n"
+
+		return Response(
+			stream_generator(),
+			mimetype="text/event-stream",
+			headers={
+				"Cache-Control": "no-cache",
+				"Connection": "keep-alive",
+				"X-Accel-Buffering": "no",
+			},
+		)
+
 	def _render_error(self, error_message: str):
 		"""Render error response."""
 		error_data = {"error": error_message}
@@ -362,12 +453,16 @@ class AgentStreamRenderer(BaseRenderer):
 					const data = JSON.parse(event.data);
 					
 					if (data.type === 'delta') {
-						// Update response with accumulated content
-						responseDiv.textContent = data.full_response || '';
+						// Deltas carry only new text; the client accumulates it
+						responseDiv.textContent += data.content || '';
 						updateStatus('Streaming...', 'streaming');
 					} else if (data.type === 'tool_call') {
 						// Show tool call info
 						const toolName = data.tool_call?.function?.name || 'Unknown';
+					} else if (data.type === 'error') {
+						updateStatus(data.error || 'Error', 'error');
+						eventSource.close();
+						streamBtn.disabled = false;
 					} else if (data.type === 'complete') {
 						// Handle completion
 						responseDiv.textContent = data.full_response || responseDiv.textContent;
@@ -392,6 +487,14 @@ class AgentStreamRenderer(BaseRenderer):
 					// Ignore
 				}
 				
+				// EventSource reconnects on its own and sends Last-Event-ID,
+				// which resumes the same run on the server. Inline streams have
+				// no event ids; reconnecting would start a new run.
+				if (eventSource.readyState === EventSource.CONNECTING && eventSource.lastEventId) {
+					updateStatus('Reconnecting...', 'streaming');
+					return;
+				}
+
 				updateStatus('Connection error', 'error');
 				eventSource.close();
 				streamBtn.disabled = false;
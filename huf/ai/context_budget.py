@@ -0,0 +1,165 @@
+import hashlib
+import json
+import threading
+from collections import OrderedDict, defaultdict, deque
+
+import litellm
+
+DEFAULT_TRIM_RATIO = 0.75  # same headroom litellm's trim_messages leaves for the answer
+MESSAGE_OVERHEAD_TOKENS = 4
+CHARS_PER_TOKEN = 4
+TRUNCATED_TOOL_OUTPUT = "[Tool output removed to fit the context window]"
+TOKEN_COUNT_CACHE_SIZE = 4096
+
+# Never evicted: agent instructions, conversation summary / memory, and the
+# current user message (which carries the injected knowledge).
+PINNED_CATEGORIES = ("system", "summary", "prompt")
+
+# Share of the budget left after pinned messages that each evictable category
+# may use. When over budget, the category furthest above its share is trimmed
+# first, oldest message first.
+DEFAULT_POLICY = {
+    "history": 0.4,
+    "tool": 0.6,
+}
+
+
+# (model, text digest) -> token count; keyed on a digest so the cache does
+# not keep large tool outputs and documents alive
+_token_counts = OrderedDict()
+_token_counts_lock = threading.Lock()
+
+
+def get_input_token_limit(model):
+    """Max input tokens for a litellm model name; None when litellm does not know the model."""
+    try:
+        info = litellm.get_model_info(model)
+        return info.get("max_input_tokens") or info.get("max_tokens")
+    except Exception:
+        return None
+
+
+def count_text_tokens(text, model=None):
+    """Token count of a text; model=None uses litellm's default tokenizer."""
+    if not text:
+        return 0
+
+    key = (model or "", hashlib.blake2b(text.encode(), digest_size=16).digest())
+    with _token_counts_lock:
+        tokens = _token_counts.get(key)
+        if tokens is not None:
+            _token_counts.move_to_end(key)
+            return tokens
+
+    try:
+        tokens = litellm.token_counter(model=model or "", text=text)
+    except Exception:
+        tokens = len(text) // CHARS_PER_TOKEN + 1
+
+    with _token_counts_lock:
+        _token_counts[key] = tokens
+        if len(_token_counts) > TOKEN_COUNT_CACHE_SIZE:
+            _token_counts.popitem(last=False)
+    return tokens
+
+
+def count_message_tokens(message, model=None):
+    """Token count of one chat message (content, tool calls and per-message overhead)."""
+    content = message.get("content")
+    if isinstance(content, list):
+        content = " ".join(
+            part.get("text", "") if isinstance(part, dict) else str(part) for part in content
+        )
+    elif content is not None and not isinstance(content, str):
+        content = json.dumps(content, default=str)
+
+    tokens = MESSAGE_OVERHEAD_TOKENS + count_text_tokens(content, model)
+    if message.get("tool_calls"):
+        tokens += count_text_tokens(json.dumps(message["tool_calls"], default=str), model)
+    return tokens
+
+
+class ContextBudget:
+    """
+    Keeps a run's message list within the model's context window.
+
+    Every message is tokenized once when added and its count is kept for the
+    rest of the run, so later rounds only count what they add. fit() evicts
+    incrementally by policy: old history messages are dropped, old tool
+    outputs are replaced by a short placeholder (the tool message stays so
+    tool_call ids remain paired).
+
+    When the model's context window is unknown (custom or self-hosted
+    models) there is no budget: messages are neither counted nor evicted.
+    """
+
+    def __init__(self, model, max_tokens=None, policy=None, trim_ratio=DEFAULT_TRIM_RATIO):
+        self.model = model
+        limit = max_tokens or get_input_token_limit(model)
+        self.budget = int(limit * trim_ratio) if limit else None
+        self.policy = {**DEFAULT_POLICY, **(policy or {})}
+        self.messages = []
+        self.total = 0
+        self.used = defaultdict(int)
+        self._tokens = {}                  # id(message) -> (message, category, tokens)
+        self._evictable = defaultdict(deque)
+
+    def append(self, message, category="history"):
+        if self.budget is None:
+            self.messages.append(message)
+            return
+
+        tokens = count_message_tokens(message, self.model)
+        self.messages.append(message)
+        self._tokens[id(message)] = (message, category, tokens)
+        self.used[category] += tokens
+        self.total += tokens
+
+        if category == "history" or (category == "tool" and message.get("role") == "tool"):
+            self._evictable[category].append(message)
+
+    def extend(self, messages, category="history"):
+        for message in messages:
+            self.append(message, category)
+
+    def fit(self):
+        """Evict until within budget; returns self.messages, updated in place."""
+        if self.budget is None:
+            return self.messages
+
+        while self.total > self.budget:
+            category = self._pick_category()
+            if not category:
+                # Only pinned messages left; send as is and let the provider decide
+                break
+            self._evict_oldest(category)
+        return self.messages
+
+    def _pick_category(self):
+        pinned = sum(self.used[c] for c in PINNED_CATEGORIES)
+        available = max(self.budget - pinned, 1)
+
+        best, best_ratio = None, None
+        for category, share in self.policy.items():
+            if not self._evictable[category]:
+                continue
+            ratio = self.used[category] / max(share * available, 1)
+            if best_ratio is None or ratio > best_ratio:
+                best, best_ratio = category, ratio
+        return best
+
+    def _evict_oldest(self, category):
+        message = self._evictable[category].popleft()
+        _, _, tokens = self._tokens.pop(id(message))
+
+        if category == "tool":
+            message["content"] = TRUNCATED_TOOL_OUTPUT
+            remaining = count_message_tokens(message, self.model)
+            self._tokens[id(message)] = (message, category, remaining)
+        else:
+            remaining = 0
+            index = next(i for i, m in enumerate(self.messages) if m is message)
+            del self.messages[index]
+
+        self.used[category] -= tokens - remaining
+        self.total -= tokens - remaining
@@ -2,6 +2,29 @@ import frappe
 from frappe.utils import now
 import json
 
+def reserve_message_indexes(conversation_name, count=1):
+    """
+    Atomically reserve `count` consecutive conversation_index values.
+
+    Agent Conversation.total_messages is the per-conversation counter. The
+    UPDATE locks the conversation row until commit, so concurrent writers
+    never get the same index. Returns the first reserved index.
+    """
+    frappe.db.sql("""
+        UPDATE `tabAgent Conversation`
+        SET total_messages = COALESCE(total_messages, 0) + %s, last_activity = %s
+        WHERE name = %s
+    """, (count, now(), conversation_name))
+
+    last_index = frappe.db.sql("""
+        SELECT total_messages FROM `tabAgent Conversation` WHERE name = %s
+    """, (conversation_name,))
+
+    if not last_index:
+        frappe.throw(f"Agent Conversation {conversation_name} not found")
+
+    return last_index[0][0] - count + 1
+
 class ConversationManager:
     def __init__(self, agent_name, channel=None, external_id=None, session_id=None):
         self.agent_name = agent_name
@@ -77,13 +100,7 @@ class ConversationManager:
     def add_message(self, conversation, role, content, provider, model, agent, run_name=None, kind="Message", tool_call_id=None):
         """Add message to conversation"""
         try:
-            last_index = frappe.db.sql("""
-                SELECT MAX(conversation_index) as last_index
-                FROM `tabAgent Message`
-                WHERE conversation = %s
-            """, (conversation.name,), as_dict=1)
-
-            last_index = last_index[0].last_index if last_index and last_index[0].last_index is not None else 0
+            conversation_index = reserve_message_indexes(conversation.name)
             message = frappe.get_doc({
                 "doctype": "Agent Message",
                 "conversation": conversation.name,
@@ -96,17 +113,12 @@ class ConversationManager:
                 "agent": agent,
                 "provider": provider,
                 "model": model,
-                "conversation_index": last_index + 1,
+                "conversation_index": conversation_index,
                 "is_agent_message": 1 if role == "agent" else 0,
                 "tool_calll": tool_call_id 
             })
             message.insert()
 
-            frappe.db.set_value("Agent Conversation", conversation.name, {
-                "total_messages": last_index + 1,
-                "last_activity": now()
-            })
-
             return message
         except Exception as e:
             frappe.log_error(f"Error adding message: {str(e)}", "Conversation Manager")
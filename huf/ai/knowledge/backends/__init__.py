@@ -6,6 +6,7 @@ Phase 1: SQLite FTS only
 Future: Chroma, pgvector, managed vector DBs
 """
 
+import time
 from abc import ABC, abstractmethod
 from typing import List, Dict, Any, Optional
 from dataclasses import dataclass
@@ -22,6 +23,10 @@ class ChunkResult:
 	metadata: Optional[Dict[str, Any]] = None
 
 
+class KnowledgeIndexMissingError(Exception):
+	"""Raised when a knowledge source has no built index to search."""
+
+
 class KnowledgeBackend(ABC):
 	"""Abstract base class for knowledge backends."""
 	
@@ -30,11 +35,36 @@ class KnowledgeBackend(ABC):
 		"""Initialize the backend for a knowledge source."""
 		pass
 	
+	@abstractmethod
+	def open_for_search(self, knowledge_source: str, config: Dict[str, Any]) -> None:
+		"""
+		Open an existing index for reading only.
+		
+		Must not create files or run schema changes. Raises
+		KnowledgeIndexMissingError when the index has not been built.
+		"""
+		pass
+	
 	@abstractmethod
 	def add_chunks(self, chunks: List[Dict[str, Any]]) -> int:
 		"""Add chunks to the backend. Returns number added."""
 		pass
 	
+	def bulk_add_chunks(self, chunks: List[Dict[str, Any]], batch_size: Optional[int] = None) -> Dict[str, Any]:
+		"""
+		Load many chunks at once. Returns 'rows', 'seconds' and 'rows_per_sec'.
+		
+		Backends override this with a faster path; the default uses add_chunks.
+		"""
+		start = time.monotonic()
+		rows = self.add_chunks(chunks)
+		seconds = time.monotonic() - start
+		return {
+			"rows": rows,
+			"seconds": seconds,
+			"rows_per_sec": rows / seconds if seconds > 0 else float(rows),
+		}
+	
 	@abstractmethod
 	def delete_chunks(self, input_id: str) -> int:
 		"""Delete all chunks for an input. Returns number deleted."""
@@ -3,6 +3,8 @@
 import os
 import sqlite3
 import json
+import threading
+import time
 import uuid
 from typing import List, Dict, Any, Optional
 from contextlib import contextmanager
@@ -10,7 +12,84 @@ from contextlib import contextmanager
 import frappe
 from frappe.utils import get_files_path
 
-from . import KnowledgeBackend, ChunkResult
+from . import KnowledgeBackend, ChunkResult, KnowledgeIndexMissingError
+
+
+# Read-only connections kept per process and database file, so repeated
+# searches reuse a warm page cache instead of reconnecting.
+READ_POOL_MAX_IDLE = 4
+READ_PRAGMAS = {
+	"cache_size": -64000,
+	"temp_store": "MEMORY",
+	"query_only": 1,
+}
+
+_read_pools: Dict[str, Dict[str, Any]] = {}
+_read_pools_lock = threading.Lock()
+
+
+def _file_identity(db_path: str) -> Optional[tuple]:
+	"""Identity of the database file; changes when it is replaced or rewritten."""
+	try:
+		st = os.stat(db_path)
+	except OSError:
+		return None
+	return (st.st_dev, st.st_ino, st.st_mtime_ns)
+
+
+def _apply_pragmas(conn: sqlite3.Connection, pragmas: Dict[str, Any]) -> None:
+	for pragma, value in pragmas.items():
+		if isinstance(value, str):
+			conn.execute(f"PRAGMA {pragma} = '{value}'")
+		else:
+			conn.execute(f"PRAGMA {pragma} = {value}")
+
+
+def _checkout_read_connection(db_path: str):
+	"""Take an idle read-only connection for db_path, opening one if needed."""
+	identity = _file_identity(db_path)
+	with _read_pools_lock:
+		pool = _read_pools.get(db_path)
+		if pool and pool["identity"] != identity:
+			# File was rebuilt or replaced: drop connections to the old one
+			for conn in pool["idle"]:
+				conn.close()
+			pool = None
+		if pool is None:
+			pool = _read_pools[db_path] = {"identity": identity, "idle": []}
+		if pool["idle"]:
+			return pool["idle"].pop(), identity
+
+	conn = sqlite3.connect(f"file:{db_path}?mode=ro", uri=True, check_same_thread=False)
+	conn.row_factory = sqlite3.Row
+	try:
+		_apply_pragmas(conn, READ_PRAGMAS)
+	except Exception:
+		conn.close()
+		raise
+	return conn, identity
+
+
+def _release_read_connection(db_path: str, conn: sqlite3.Connection, identity: Optional[tuple]) -> None:
+	"""Return a connection to the pool, or close it if the pool moved on or is full."""
+	if conn.in_transaction:
+		conn.rollback()
+	with _read_pools_lock:
+		pool = _read_pools.get(db_path)
+		if pool and pool["identity"] == identity and len(pool["idle"]) < READ_POOL_MAX_IDLE:
+			pool["idle"].append(conn)
+			return
+	conn.close()
+
+
+def close_read_connections(db_path: Optional[str] = None) -> None:
+	"""Close pooled read-only connections for one database file (or all)."""
+	with _read_pools_lock:
+		paths = [db_path] if db_path else list(_read_pools)
+		for path in paths:
+			pool = _read_pools.pop(path, None)
+			for conn in (pool or {}).get("idle", []):
+				conn.close()
 
 
 class SQLiteFTSBackend(KnowledgeBackend):
@@ -58,6 +137,16 @@ class SQLiteFTSBackend(KnowledgeBackend):
 	CREATE INDEX IF NOT EXISTS idx_chunks_input_id ON chunks(input_id);
 	"""
 	
+	CHUNKS_AI_TRIGGER = """
+	CREATE TRIGGER IF NOT EXISTS chunks_ai AFTER INSERT ON chunks BEGIN
+		INSERT INTO chunks_fts(rowid, text, source_title) 
+		VALUES (new.rowid, new.text, new.source_title);
+	END;
+	"""
+	
+	# Rows per transaction in bulk_add_chunks
+	BULK_BATCH_SIZE = 5000
+	
 	PRAGMAS = {
 		"journal_mode": "WAL",
 		"synchronous": "NORMAL",
@@ -74,78 +163,153 @@ class SQLiteFTSBackend(KnowledgeBackend):
 		"""Initialize SQLite database for knowledge source."""
 		self.knowledge_source = knowledge_source
 		self._config = config
-		
-		# Determine database path
-		files_path = get_files_path(is_private=True)
-		knowledge_dir = os.path.join(files_path, "knowledge")
-		os.makedirs(knowledge_dir, exist_ok=True)
-		
-		# Sanitize name for filesystem
-		safe_name = frappe.scrub(knowledge_source)
-		self.db_path = os.path.join(knowledge_dir, f"{safe_name}.sqlite3")
+		self.db_path = self._get_db_path(knowledge_source)
+		os.makedirs(os.path.dirname(self.db_path), exist_ok=True)
 		
 		# Create database and schema
 		with self._get_connection() as conn:
 			conn.executescript(self.SCHEMA)
 	
+	def open_for_search(self, knowledge_source: str, config: Dict[str, Any]) -> None:
+		"""Point at an existing database for read-only use; no DDL, no writes."""
+		self.knowledge_source = knowledge_source
+		self._config = config
+		self.db_path = self._get_db_path(knowledge_source)
+		
+		if not os.path.exists(self.db_path):
+			raise KnowledgeIndexMissingError(
+				f"Knowledge index for {knowledge_source} not found at {self.db_path}"
+			)
+	
+	@staticmethod
+	def _get_db_path(knowledge_source: str) -> str:
+		"""Database path for a knowledge source (name sanitized for filesystem)."""
+		files_path = get_files_path(is_private=True)
+		safe_name = frappe.scrub(knowledge_source)
+		return os.path.join(files_path, "knowledge", f"{safe_name}.sqlite3")
+	
 	@contextmanager
 	def _get_connection(self, readonly: bool = False):
-		"""Get SQLite connection with proper settings."""
-		mode = "ro" if readonly else "rwc"
-		uri = f"file:{self.db_path}?mode={mode}"
+		"""Get SQLite connection with proper settings.
+		
+		Read-only connections come from a per-process pool and stay open.
+		"""
+		if readonly:
+			with self._get_read_connection() as conn:
+				yield conn
+			return
+		
+		uri = f"file:{self.db_path}?mode=rwc"
 		
 		conn = sqlite3.connect(uri, uri=True)
 		conn.row_factory = sqlite3.Row
 		
 		try:
-			# Apply pragmas
-			for pragma, value in self.PRAGMAS.items():
-				if isinstance(value, str):
-					conn.execute(f"PRAGMA {pragma} = '{value}'")
-				else:
-					conn.execute(f"PRAGMA {pragma} = {value}")
+			_apply_pragmas(conn, self.PRAGMAS)
 			
 			yield conn
 			
-			if not readonly:
-				conn.commit()
+			conn.commit()
 		except Exception:
-			if not readonly:
-				conn.rollback()
+			conn.rollback()
 			raise
 		finally:
 			conn.close()
 	
+	@contextmanager
+	def _get_read_connection(self):
+		"""Borrow a pooled read-only connection for this database."""
+		conn, identity = _checkout_read_connection(self.db_path)
+		try:
+			yield conn
+		except Exception:
+			conn.close()
+			raise
+		else:
+			_release_read_connection(self.db_path, conn, identity)
+	
 	def add_chunks(self, chunks: List[Dict[str, Any]]) -> int:
 		"""Add chunks to the database."""
 		if not chunks:
 			return 0
 		
 		with self._get_connection() as conn:
-			cursor = conn.cursor()
+			conn.executemany("""
+				INSERT OR REPLACE INTO chunks 
+				(chunk_id, input_id, input_type, source_title, chunk_index, 
+				 text, char_start, char_end, metadata)
+				VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?)
+			""", self._chunk_rows(chunks))
 			
-			for chunk in chunks:
-				chunk_id = chunk.get("chunk_id") or str(uuid.uuid4())
-				metadata = json.dumps(chunk.get("metadata", {}))
-				
-				cursor.execute("""
+			return len(chunks)
+	
+	def bulk_add_chunks(self, chunks: List[Dict[str, Any]], batch_size: Optional[int] = None) -> Dict[str, Any]:
+		"""
+		Bulk-load chunks with executemany.
+		
+		Per transaction of batch_size rows, the per-row FTS trigger is dropped,
+		rows are inserted, the new rowids are added to the FTS index in one
+		INSERT ... SELECT and the trigger is restored before commit. All of
+		it runs in one BEGIN IMMEDIATE transaction, so a failed batch leaves
+		the trigger in place.
+		"""
+		batch_size = batch_size or self._config.get("bulk_batch_size") or self.BULK_BATCH_SIZE
+		start = time.monotonic()
+		rows = 0
+		
+		for offset in range(0, len(chunks), batch_size):
+			params = self._chunk_rows(chunks[offset:offset + batch_size])
+			
+			with self._get_connection() as conn:
+				# sqlite3 autocommits DDL outside a transaction; open one explicitly so a
+				# failed batch rolls back the DROP TRIGGER too, and take the write lock
+				# before reading the rowid watermark so no other writer interleaves.
+				conn.execute("BEGIN IMMEDIATE")
+				last_rowid = conn.execute("SELECT COALESCE(MAX(rowid), 0) FROM chunks").fetchone()[0]
+				conn.execute("DROP TRIGGER IF EXISTS chunks_ai")
+				conn.executemany("""
 					INSERT OR REPLACE INTO chunks 
 					(chunk_id, input_id, input_type, source_title, chunk_index, 
 					 text, char_start, char_end, metadata)
 					VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?)
-				""", (
-					chunk_id,
-					chunk["input_id"],
-					chunk["input_type"],
-					chunk.get("source_title"),
-					chunk["chunk_index"],
-					chunk["text"],
-					chunk.get("char_start"),
-					chunk.get("char_end"),
-					metadata,
-				))
+				""", params)
+				conn.execute("""
+					INSERT INTO chunks_fts(rowid, text, source_title)
+					SELECT rowid, text, source_title FROM chunks WHERE rowid > ?
+				""", (last_rowid,))
+				conn.execute(self.CHUNKS_AI_TRIGGER)
 			
-			return len(chunks)
+			rows += len(params)
+		
+		seconds = time.monotonic() - start
+		return {
+			"rows": rows,
+			"seconds": seconds,
+			"rows_per_sec": rows / seconds if seconds > 0 else float(rows),
+		}
+	
+	@staticmethod
+	def _chunk_rows(chunks: List[Dict[str, Any]]) -> List[tuple]:
+		"""Convert chunk dicts to insert parameters, serializing shared metadata once."""
+		rows = []
+		last_metadata, last_json = None, None
+		for chunk in chunks:
+			metadata = chunk.get("metadata", {})
+			if metadata is not last_metadata:
+				last_metadata, last_json = metadata, json.dumps(metadata)
+			
+			rows.append((
+				chunk.get("chunk_id") or str(uuid.uuid4()),
+				chunk["input_id"],
+				chunk["input_type"],
+				chunk.get("source_title"),
+				chunk["chunk_index"],
+				chunk["text"],
+				chunk.get("char_start"),
+				chunk.get("char_end"),
+				last_json,
+			))
+		return rows
 	
 	def delete_chunks(self, input_id: str) -> int:
 		"""Delete all chunks for an input."""
@@ -170,20 +334,27 @@ class SQLiteFTSBackend(KnowledgeBackend):
 		safe_query = self._escape_fts_query(query)
 		
 		with self._get_connection(readonly=True) as conn:
-			cursor = conn.execute("""
-				SELECT 
-					c.chunk_id,
-					c.text,
-					c.source_title,
-					c.input_id,
-					c.metadata,
-					bm25(chunks_fts, 1.0, 0.75) AS score
-				FROM chunks_fts
-				JOIN chunks c ON chunks_fts.rowid = c.rowid
-				WHERE chunks_fts MATCH ?
-				ORDER BY score
-				LIMIT ?
-			""", (safe_query, top_k))
+			try:
+				cursor = conn.execute("""
+					SELECT 
+						c.chunk_id,
+						c.text,
+						c.source_title,
+						c.input_id,
+						c.metadata,
+						bm25(chunks_fts, 1.0, 0.75) AS score
+					FROM chunks_fts
+					JOIN chunks c ON chunks_fts.rowid = c.rowid
+					WHERE chunks_fts MATCH ?
+					ORDER BY score
+					LIMIT ?
+				""", (safe_query, top_k))
+			except sqlite3.OperationalError as e:
+				if "no such table" in str(e):
+					raise KnowledgeIndexMissingError(
+						f"Knowledge index for {self.knowledge_source} has no schema"
+					) from e
+				raise
 			
 			results = []
 			for row in cursor.fetchall():
@@ -0,0 +1,283 @@
+"""
+Benchmark harness for the knowledge pipeline.
+
+Runs offline against a temporary/test site and removes everything it creates:
+
+	bench --site test_site execute huf.ai.knowledge.benchmark.run \
+		--kwargs "{'sizes': [1000, 10000], 'source_counts': [1, 5], 'output': 'bench_output.json'}"
+
+Measures:
+	- extract -> chunk -> index throughput of indexer.process_knowledge_input
+	- p50/p95/p99 knowledge_search latency by corpus size and number of sources
+	- cost of context_builder.build_knowledge_context
+
+Results are returned, printed and optionally written as JSON so runs can be
+compared across upgrades.
+"""
+
+import json
+import platform
+import random
+import sqlite3
+import time
+import uuid
+from typing import List, Dict, Any, Optional
+from unittest.mock import patch
+
+import frappe
+from frappe.utils import now_datetime
+
+import huf
+from .backends import get_backend
+
+BENCH_PREFIX = "_bench_"
+
+VOCABULARY = (
+	"invoice customer ledger payment warehouse stock shipment order supplier "
+	"account journal tax currency discount contract employee payroll asset "
+	"project task timesheet quotation delivery return refund budget forecast "
+	"report audit policy approval workflow pricing margin revenue expense"
+).split()
+
+QUERIES = [
+	"customer payment",
+	"warehouse stock shipment",
+	"tax audit policy",
+	"payroll employee",
+	"refund return order",
+	"budget forecast revenue",
+]
+
+
+def generate_corpus(fmt: str, paragraphs: int, seed: int = 42) -> str:
+	"""Generate deterministic synthetic text, markdown or HTML."""
+	rng = random.Random(seed)
+	parts = []
+	for i in range(paragraphs):
+		sentences = []
+		for _ in range(rng.randint(3, 6)):
+			words = rng.choices(VOCABULARY, k=rng.randint(8, 16))
+			sentences.append(" ".join(words).capitalize() + f" ref{i}.")
+		text = " ".join(sentences)
+
+		if fmt == "markdown":
+			parts.append(f"## Section {i}\n\n{text}\n")
+		elif fmt == "html":
+			parts.append(f"<h2>Section {i}</h2><p>{text}</p>")
+		else:
+			parts.append(text + "\n")
+
+	if fmt == "html":
+		return f"<html><head><title>Bench</title></head><body>{''.join(parts)}</body></html>"
+	return "\n".join(parts)
+
+
+def generate_chunks(count: int, input_id: str, seed: int = 42) -> List[Dict[str, Any]]:
+	"""Generate synthetic chunk rows for loading a backend directly."""
+	rng = random.Random(seed)
+	metadata = {"benchmark": True}
+	return [
+		{
+			"input_id": input_id,
+			"input_type": "Text",
+			"source_title": f"Bench {input_id}",
+			"chunk_index": i,
+			"text": " ".join(rng.choices(VOCABULARY, k=80)) + f" ref{i}",
+			"metadata": metadata,
+		}
+		for i in range(count)
+	]
+
+
+def percentiles(samples: List[float]) -> Dict[str, float]:
+	"""Nearest-rank p50/p95/p99 and mean, in milliseconds."""
+	if not samples:
+		return {}
+	ordered = sorted(samples)
+
+	def rank(p):
+		return ordered[min(len(ordered) - 1, max(0, int(round(p / 100 * len(ordered))) - 1))]
+
+	return {
+		"p50_ms": rank(50) * 1000,
+		"p95_ms": rank(95) * 1000,
+		"p99_ms": rank(99) * 1000,
+		"mean_ms": sum(ordered) / len(ordered) * 1000,
+	}
+
+
+def run(
+	sizes: Optional[List[int]] = None,
+	source_counts: Optional[List[int]] = None,
+	formats: Optional[List[str]] = None,
+	ingest_paragraphs: int = 2000,
+	queries: int = 200,
+	top_k: int = 5,
+	output: Optional[str] = None,
+) -> Dict[str, Any]:
+	"""Run the full benchmark and return the results dict."""
+	sizes = sizes or [1000, 10000, 100000]
+	source_counts = source_counts or [1, 5]
+	formats = formats or ["text", "markdown", "html"]
+
+	results = {
+		"meta": {
+			"started_at": str(now_datetime()),
+			"huf_version": huf.__version__,
+			"frappe_version": frappe.__version__,
+			"python": platform.python_version(),
+			"sqlite": sqlite3.sqlite_version,
+			"site": frappe.local.site,
+		},
+		"ingest": [],
+		"search": [],
+		"context": [],
+	}
+
+	created_sources = []
+	try:
+		for fmt in formats:
+			results["ingest"].append(bench_ingest(fmt, ingest_paragraphs, created_sources))
+
+		for size in sizes:
+			for count in source_counts:
+				sources = _create_loaded_sources(size, count, created_sources)
+				results["search"].append(bench_search(sources, size, queries, top_k))
+				results["context"].append(bench_context(sources, size, queries, top_k))
+	finally:
+		_cleanup(created_sources)
+
+	payload = json.dumps(results, indent=2, default=str)
+	if output:
+		with open(output, "w") as f:
+			f.write(payload)
+	print(payload)
+	return results
+
+
+def bench_ingest(fmt: str, paragraphs: int, created_sources: list) -> Dict[str, Any]:
+	"""Time process_knowledge_input on a synthetic file of the given format."""
+	from .indexer import process_knowledge_input
+
+	source = _create_source(created_sources)
+	ext = {"text": "txt", "markdown": "md", "html": "html"}[fmt]
+	content = generate_corpus(fmt, paragraphs)
+
+	file_doc = frappe.get_doc({
+		"doctype": "File",
+		"file_name": f"{source}.{ext}",
+		"is_private": 1,
+		"content": content,
+	}).insert(ignore_permissions=True)
+
+	# db_insert skips after_insert, which would queue a second processing job
+	input_doc = frappe.get_doc({
+		"doctype": "Knowledge Input",
+		"knowledge_source": source,
+		"input_type": "File",
+		"file": file_doc.file_url,
+		"file_name": file_doc.file_name,
+		"file_type": ext,
+		"status": "Pending",
+	})
+	input_doc.name = f"{BENCH_PREFIX}{uuid.uuid4().hex[:10]}"
+	input_doc.db_insert()
+	frappe.db.commit()
+
+	start = time.perf_counter()
+	outcome = process_knowledge_input(input_doc.name)
+	seconds = time.perf_counter() - start
+
+	chunks = outcome.get("chunks_created", 0)
+	return {
+		"format": fmt,
+		"status": outcome.get("status"),
+		"error": outcome.get("error"),
+		"characters": len(content),
+		"chunks": chunks,
+		"seconds": seconds,
+		"chars_per_sec": len(content) / seconds if seconds else None,
+		"chunks_per_sec": chunks / seconds if seconds else None,
+		"index_rows_per_sec": outcome.get("rows_per_sec"),
+	}
+
+
+def bench_search(sources: List[str], size: int, queries: int, top_k: int) -> Dict[str, Any]:
+	"""knowledge_search latency over all sources."""
+	from .retriever import knowledge_search
+
+	samples = []
+	for i in range(queries):
+		start = time.perf_counter()
+		knowledge_search(QUERIES[i % len(QUERIES)], knowledge_sources=sources, top_k=top_k)
+		samples.append(time.perf_counter() - start)
+
+	return {"corpus_chunks": size, "sources": len(sources), "queries": queries, **percentiles(samples)}
+
+
+def bench_context(sources: List[str], size: int, queries: int, top_k: int) -> Dict[str, Any]:
+	"""build_knowledge_context latency with the sources as mandatory knowledge."""
+	from . import context_builder
+
+	mandatory = [
+		{"knowledge_source": s, "priority": 0, "max_chunks": top_k, "token_budget": 2000}
+		for s in sources
+	]
+	samples = []
+	# No Agent is created; the mandatory source lookup is the only stubbed call
+	with patch.object(context_builder, "get_mandatory_knowledge", return_value=mandatory):
+		for i in range(queries):
+			start = time.perf_counter()
+			context_builder.build_knowledge_context(
+				agent_name=f"{BENCH_PREFIX}agent",
+				user_query=QUERIES[i % len(QUERIES)],
+				max_tokens=4000,
+			)
+			samples.append(time.perf_counter() - start)
+
+	return {"corpus_chunks": size, "sources": len(sources), "queries": queries, **percentiles(samples)}
+
+
+def _create_source(created_sources: list) -> str:
+	name = f"{BENCH_PREFIX}{uuid.uuid4().hex[:10]}"
+	frappe.get_doc({
+		"doctype": "Knowledge Source",
+		"source_name": name,
+		"knowledge_type": "sqlite_fts",
+		"scope": "Site",
+		"storage_mode": "Frappe File",
+	}).insert(ignore_permissions=True)
+	frappe.db.commit()
+	created_sources.append(name)
+	return name
+
+
+def _create_loaded_sources(size: int, count: int, created_sources: list) -> List[str]:
+	"""Create count sources sharing size synthetic chunks, loaded straight into the backend."""
+	sources = []
+	per_source = max(1, size // count)
+	for i in range(count):
+		name = _create_source(created_sources)
+		backend = get_backend("sqlite_fts")()
+		backend.initialize(name, {})
+		backend.bulk_add_chunks(generate_chunks(per_source, name, seed=i))
+		frappe.db.set_value("Knowledge Source", name, "status", "Ready")
+		sources.append(name)
+	frappe.db.commit()
+	return sources
+
+
+def _cleanup(created_sources: list) -> None:
+	for name in created_sources:
+		try:
+			for file_url in frappe.get_all(
+				"Knowledge Input", filters={"knowledge_source": name}, pluck="file"
+			):
+				file_name = file_url and frappe.db.get_value("File", {"file_url": file_url})
+				if file_name:
+					frappe.delete_doc("File", file_name, ignore_permissions=True, force=True)
+			frappe.db.delete("Knowledge Input", {"knowledge_source": name})
+			frappe.delete_doc("Knowledge Source", name, ignore_permissions=True, force=True)
+		except Exception:
+			frappe.log_error(frappe.get_traceback(), "Knowledge Benchmark Cleanup")
+	frappe.db.commit()
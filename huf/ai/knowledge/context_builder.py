@@ -3,7 +3,8 @@
 from typing import List, Dict, Any
 import frappe
 
-from .retriever import knowledge_search, get_mandatory_knowledge
+from .retriever import multi_source_search, get_mandatory_knowledge
+from huf.ai.context_budget import count_text_tokens
 
 
 def build_knowledge_context(
@@ -33,29 +34,19 @@ def build_knowledge_context(
 			"chunks_used": [],
 		}
 	
-	all_chunks = []
-	sources_used = []
+	try:
+		all_chunks = multi_source_search(user_query, mandatory_sources)
+	except Exception:
+		frappe.log_error(
+			f"Knowledge context error for {agent_name}",
+			frappe.get_traceback()
+		)
+		all_chunks = []
 	
-	for source_config in mandatory_sources:
-		source_name = source_config["knowledge_source"]
-		max_chunks = source_config["max_chunks"]
-		
-		try:
-			results = knowledge_search(
-				query=user_query,
-				knowledge_source=source_name,
-				top_k=max_chunks,
-			)
-			
-			if results:
-				all_chunks.extend(results)
-				sources_used.append(source_name)
-				
-		except Exception as e:
-			frappe.log_error(
-				f"Knowledge context error for {source_name}",
-				frappe.get_traceback()
-			)
+	# Keep source priority order; within a source, chunks stay best-first
+	rank = {c["knowledge_source"]: i for i, c in enumerate(mandatory_sources)}
+	all_chunks.sort(key=lambda c: rank[c["source"]])
+	sources_used = sorted({c["source"] for c in all_chunks}, key=rank.get)
 	
 	if not all_chunks:
 		return {
@@ -70,8 +61,7 @@ def build_knowledge_context(
 	estimated_tokens = 0
 	
 	for chunk in all_chunks:
-		# Rough token estimation (4 chars per token)
-		chunk_tokens = len(chunk["text"]) // 4
+		chunk_tokens = count_text_tokens(chunk["text"])
 		
 		if estimated_tokens + chunk_tokens > max_tokens:
 			break
@@ -47,6 +47,9 @@ def on_knowledge_source_deleted(doc, method):
 		safe_name = frappe.scrub(doc.name)
 		db_path = os.path.join(files_path, "knowledge", f"{safe_name}.sqlite3")
 		
+		from huf.ai.knowledge.backends.sqlite_fts import close_read_connections
+		close_read_connections(db_path)
+		
 		if os.path.exists(db_path):
 			os.remove(db_path)
 		
@@ -67,13 +67,19 @@ def process_knowledge_input(knowledge_input: str) -> dict:
 			backend.initialize(source.name, {
 				"chunk_size": source.chunk_size,
 				"chunk_overlap": source.chunk_overlap,
+				"bulk_batch_size": frappe.conf.get("knowledge_bulk_batch_size"),
 			})
 			
 			# Delete existing chunks for this input (for reprocessing)
 			backend.delete_chunks(doc.name)
 			
 			# Add new chunks
-			chunks_added = backend.add_chunks(chunk_data)
+			load_stats = backend.bulk_add_chunks(chunk_data)
+			chunks_added = load_stats["rows"]
+			frappe.logger().info(
+				f"[Knowledge] Indexed {chunks_added} chunks for {doc.name} "
+				f"({load_stats['rows_per_sec']:.0f} rows/sec)"
+			)
 			
 			# Update input status
 			doc.status = "Indexed"
@@ -98,6 +104,7 @@ def process_knowledge_input(knowledge_input: str) -> dict:
 				"status": "success",
 				"chunks_created": chunks_added,
 				"character_count": extracted.character_count,
+				"rows_per_sec": load_stats["rows_per_sec"],
 			}
 			
 		finally:
@@ -1,10 +1,17 @@
 """Knowledge retrieval system."""
 
+import heapq
+import traceback
+from concurrent.futures import ThreadPoolExecutor
 from typing import List, Dict, Any, Optional
 import frappe
 from frappe import _
 
-from .backends import get_backend, ChunkResult
+from .backends import get_backend, ChunkResult, KnowledgeIndexMissingError
+
+# Sources are searched concurrently; SQLite releases the GIL while querying
+SEARCH_MAX_WORKERS = 8
+_search_executor = None
 
 
 @frappe.whitelist()
@@ -42,55 +49,124 @@ def knowledge_search(
 	else:
 		frappe.throw(_("Either knowledge_source or knowledge_sources is required"))
 	
-	# Collect results from all sources
-	all_results = []
+	return multi_source_search(
+		query,
+		[{"knowledge_source": name, "max_chunks": top_k} for name in sources],
+		top_k=top_k,
+		filters=filters,
+	)
+
+
+def multi_source_search(
+	query: str,
+	source_configs: List[Dict[str, Any]],
+	top_k: Optional[int] = None,
+	filters: Optional[Dict[str, Any]] = None,
+) -> List[Dict[str, Any]]:
+	"""
+	Search several knowledge sources concurrently and merge by score.
+	
+	Args:
+		query: The search query
+		source_configs: Dicts with 'knowledge_source' and 'max_chunks' (per-source quota)
+		top_k: Maximum results overall (defaults to the sum of quotas)
+		filters: Additional filters passed to each backend
+	
+	Returns:
+		Merged chunk results, best score first
+	"""
+	if not query or not query.strip() or not source_configs:
+		return []
 	
-	for source_name in sources:
+	quotas = {c["knowledge_source"]: c.get("max_chunks") or 5 for c in source_configs}
+	if top_k is None:
+		top_k = sum(quotas.values())
+	
+	# Backends are prepared here because they need the site context;
+	# only the SQLite queries run in the pool.
+	backends = []
+	for source in _get_searchable_sources(list(quotas)):
 		try:
-			source = frappe.get_doc("Knowledge Source", source_name)
-			
-			# Check if source is ready
-			if source.status != "Ready":
-				continue
-			
-			if source.disabled:
-				continue
-			
-			# Initialize backend
-			backend_class = get_backend(source.knowledge_type)
-			backend = backend_class()
-			backend.initialize(source_name, {})
-			
-			# Search
-			results = backend.search(query, top_k=top_k, filters=filters)
-			
-			# Add source information
-			for result in results:
-				all_results.append({
-					"text": result.text,
-					"title": result.title,
-					"score": result.score,
-					"chunk_id": result.chunk_id,
-					"source": source_name,
-					"metadata": result.metadata,
-				})
-				
-		except (frappe.DoesNotExistError, frappe.ValidationError):
-			# Source doesn't exist or is invalid, just skip
-			continue
-			
+			backend = get_backend(source.knowledge_type)()
+			backend.open_for_search(source.name, {})
+			backends.append((source.name, backend))
+		except KnowledgeIndexMissingError as e:
+			_mark_index_missing(source.name, e)
+		except Exception:
+			frappe.log_error(
+				f"Knowledge search error for {source.name}",
+				frappe.get_traceback()
+			)
+	
+	if not backends:
+		return []
+	
+	def run(item):
+		source_name, backend = item
+		try:
+			return source_name, backend.search(query, top_k=quotas[source_name], filters=filters), None
 		except Exception as e:
+			return source_name, [], e
+	
+	if len(backends) == 1:
+		outcomes = [run(backends[0])]
+	else:
+		outcomes = list(_get_search_executor().map(run, backends))
+	
+	candidates = []
+	for source_name, results, error in outcomes:
+		if isinstance(error, KnowledgeIndexMissingError):
+			_mark_index_missing(source_name, error)
+			continue
+		if error is not None:
 			frappe.log_error(
 				f"Knowledge search error for {source_name}",
-				frappe.get_traceback()
+				"".join(traceback.format_exception(type(error), error, error.__traceback__))
 			)
 			continue
+		
+		for result in results[:quotas[source_name]]:
+			candidates.append({
+				"text": result.text,
+				"title": result.title,
+				"score": result.score,
+				"chunk_id": result.chunk_id,
+				"source": source_name,
+				"metadata": result.metadata,
+			})
 	
-	# Sort by score across all sources
-	all_results.sort(key=lambda x: x["score"], reverse=True)
-	
-	# Limit to top_k total
-	return all_results[:top_k]
+	return heapq.nlargest(top_k, candidates, key=lambda x: x["score"])
+
+
+def _get_searchable_sources(source_names: List[str]) -> List[Dict[str, Any]]:
+	"""Fetch metadata of all Ready, enabled sources in one query, keeping input order."""
+	rows = frappe.get_all(
+		"Knowledge Source",
+		filters={"name": ["in", source_names], "status": "Ready", "disabled": 0},
+		fields=["name", "knowledge_type"],
+	)
+	by_name = {row.name: row for row in rows}
+	return [by_name[name] for name in source_names if name in by_name]
+
+
+def _mark_index_missing(source_name: str, error: Exception) -> None:
+	"""Move a Ready source whose index is gone into the Error state."""
+	frappe.db.set_value(
+		"Knowledge Source",
+		source_name,
+		{"status": "Error", "error_message": f"{error}. Rebuild the index."[:500]},
+		update_modified=False,
+	)
+	frappe.log_error(str(error), "Knowledge Index Missing")
+
+
+def _get_search_executor() -> ThreadPoolExecutor:
+	global _search_executor
+	if _search_executor is None:
+		_search_executor = ThreadPoolExecutor(
+			max_workers=SEARCH_MAX_WORKERS, thread_name_prefix="huf-knowledge"
+		)
+	return _search_executor
 
 
 def get_mandatory_knowledge(agent_name: str) -> List[Dict[str, Any]]:
@@ -0,0 +1,62 @@
+import os
+import sqlite3
+import tempfile
+
+from frappe.tests.utils import FrappeTestCase
+
+from huf.ai.knowledge.backends.sqlite_fts import SQLiteFTSBackend
+
+
+def make_chunk(index, text):
+    return {
+        "chunk_id": f"chunk-{index}",
+        "input_id": "input-1",
+        "input_type": "Text",
+        "source_title": "Test",
+        "chunk_index": index,
+        "text": text,
+    }
+
+
+class TestSQLiteFTSBulkLoad(FrappeTestCase):
+    def setUp(self):
+        self.tmpdir = tempfile.TemporaryDirectory()
+        self.backend = SQLiteFTSBackend()
+        self.backend.db_path = os.path.join(self.tmpdir.name, "test.sqlite3")
+        with self.backend._get_connection() as conn:
+            conn.executescript(SQLiteFTSBackend.SCHEMA)
+
+    def tearDown(self):
+        self.tmpdir.cleanup()
+
+    def has_insert_trigger(self):
+        with self.backend._get_connection() as conn:
+            return bool(conn.execute(
+                "SELECT 1 FROM sqlite_master WHERE type = 'trigger' AND name = 'chunks_ai'"
+            ).fetchone())
+
+    def test_failed_batch_keeps_insert_trigger(self):
+        # text is NOT NULL, so the second row fails the executemany
+        chunks = [make_chunk(0, "invoice payment"), make_chunk(1, None)]
+        with self.assertRaises(sqlite3.IntegrityError):
+            self.backend.bulk_add_chunks(chunks)
+
+        self.assertTrue(self.has_insert_trigger())
+
+        # Rows added one by one afterwards are still indexed
+        self.backend.add_chunks([make_chunk(2, "warehouse shipment")])
+        with self.backend._get_connection() as conn:
+            matches = conn.execute(
+                "SELECT rowid FROM chunks_fts WHERE chunks_fts MATCH 'warehouse'"
+            ).fetchall()
+            count = conn.execute("SELECT COUNT(*) FROM chunks").fetchone()[0]
+        self.assertEqual(len(matches), 1)
+        self.assertEqual(count, 1)
+
+    def test_bulk_load_indexes_rows(self):
+        stats = self.backend.bulk_add_chunks([make_chunk(i, f"ledger entry {i}") for i in range(10)])
+        self.assertEqual(stats["rows"], 10)
+        self.assertTrue(self.has_insert_trigger())
+        with self.backend._get_connection() as conn:
+            matches = conn.execute("SELECT rowid FROM chunks_fts WHERE chunks_fts MATCH 'ledger'").fetchall()
+        self.assertEqual(len(matches), 10)
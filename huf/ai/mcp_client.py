@@ -27,6 +27,9 @@ from frappe.utils import now_datetime
 
 from agents import FunctionTool
 
+from huf.ai.mcp_pool import get_mcp_server_config, mcp_request
+from huf.ai import mcp_result_cache
+
 
 # MCP Tool prefix to identify MCP-sourced tools during execution
 MCP_TOOL_PREFIX = "__mcp__"
@@ -76,8 +79,12 @@ def create_mcp_tools(agent_doc) -> list[FunctionTool]:
                     "parameters": parameters
                 }
                 
-                tool = _create_mcp_function_tool(mcp_server, tool_def)
+                cache_ttl = 0
+                if tool_row.get("cacheable") and not tool_row.get("has_side_effects"):
+                    cache_ttl = tool_row.cache_ttl or 0
+                tool = _create_mcp_function_tool(mcp_server, tool_def, cache_ttl=cache_ttl)
                 if tool:
+                    tool.has_side_effects = bool(tool_row.get("has_side_effects"))
                     tools.append(tool)
                     
         except Exception as e:
@@ -109,7 +116,7 @@ def _get_cached_mcp_tools(mcp_server) -> list[dict]:
         return []
 
 
-def _create_mcp_function_tool(mcp_server, tool_def: dict) -> FunctionTool:
+def _create_mcp_function_tool(mcp_server, tool_def: dict, cache_ttl: int = 0) -> FunctionTool:
     """
     Create a FunctionTool wrapper for an MCP tool.
     
@@ -118,6 +125,7 @@ def _create_mcp_function_tool(mcp_server, tool_def: dict) -> FunctionTool:
     Args:
         mcp_server: MCP Server document
         tool_def: Tool definition from MCP server (OpenAI format)
+        cache_ttl: Seconds to cache successful results (0 disables the result cache)
     
     Returns:
         FunctionTool: Wrapped tool that calls MCP server on invocation
@@ -156,6 +164,11 @@ def _create_mcp_function_tool(mcp_server, tool_def: dict) -> FunctionTool:
                 
                 args_dict = json.loads(args_json or "{}")
                 
+                if cache_ttl:
+                    hit, result = mcp_result_cache.get_cached_result(server_name, original_tool_name, args_dict)
+                    if hit:
+                        return result
+                
                 # Execute the tool on the MCP server
                 result = await execute_mcp_tool(
                     server_name=server_name,
@@ -163,7 +176,14 @@ def _create_mcp_function_tool(mcp_server, tool_def: dict) -> FunctionTool:
                     arguments=args_dict
                 )
                 
-                return json.dumps(result, default=str) if isinstance(result, (dict, list)) else str(result)
+                output = json.dumps(result, default=str) if isinstance(result, (dict, list)) else str(result)
+                
+                # Only successful results are cached; errors are retried on the next call
+                failed = isinstance(result, dict) and (result.get("error") or result.get("success") is False)
+                if cache_ttl and not failed:
+                    mcp_result_cache.set_cached_result(server_name, original_tool_name, args_dict, output, cache_ttl)
+                
+                return output
                 
             except Exception as e:
                 frappe.log_error(
@@ -215,13 +235,9 @@ async def execute_mcp_tool(
         The result from the MCP tool execution
     """
     try:
-        mcp_server = frappe.get_doc("MCP Server", server_name)
-        
-        # Build headers
-        headers = _build_mcp_headers(mcp_server)
-        return await _execute_mcp_tool_http(
-            mcp_server, tool_name, arguments, headers
-        )
+        # Cached per worker: no get_doc or password decryption per call
+        config = get_mcp_server_config(server_name)
+        return await _execute_mcp_tool_http(config, tool_name, arguments)
         
         # Use LiteLLM's experimental MCP client if available
         # try:
@@ -260,56 +276,31 @@ async def execute_mcp_tool(
         return {"error": str(e), "success": False}
 
 
-async def _execute_mcp_tool_http(
-    mcp_server,
-    tool_name: str,
-    arguments: dict,
-    headers: dict
-) -> Any:
+async def _execute_mcp_tool_http(config, tool_name: str, arguments: dict) -> Any:
     """
-    Fallback HTTP-based MCP tool execution.
+    HTTP-based MCP tool execution over the worker's pooled session.
     
-    This is used when LiteLLM's MCP client is not available.
+    Args:
+        config: Server config from mcp_pool.get_mcp_server_config
     """
-    import aiohttp
-    
-    url = mcp_server.server_url
-    timeout = aiohttp.ClientTimeout(total=mcp_server.timeout_seconds or 30)
-    
-    # MCP JSON-RPC format for tool calls
-    payload = {
-        "jsonrpc": "2.0",
-        "method": "tools/call",
-        "params": {
-            "name": tool_name,
-            "arguments": arguments
-        },
-        "id": 1
-    }
-    
     try:
-        async with aiohttp.ClientSession(timeout=timeout) as session:
-            async with session.post(url, json=payload, headers=headers) as response:
-                if response.status != 200:
-                    error_text = await response.text()
-                    return {
-                        "error": f"MCP server returned status {response.status}: {error_text}",
-                        "success": False
-                    }
-                
-                result = await response.json()
-                
-                # Handle JSON-RPC response
-                if "error" in result:
-                    return {
-                        "error": result["error"].get("message", "Unknown MCP error"),
-                        "success": False
-                    }
-                
-                return result.get("result", result)
+        result = await mcp_request(
+            config,
+            "tools/call",
+            {"name": tool_name, "arguments": arguments},
+        )
+        
+        # Handle JSON-RPC response
+        if "error" in result:
+            return {
+                "error": result["error"].get("message", "Unknown MCP error"),
+                "success": False
+            }
+        
+        return result.get("result", result)
                 
     except asyncio.TimeoutError:
-        return {"error": f"MCP server timeout after {mcp_server.timeout_seconds}s", "success": False}
+        return {"error": f"MCP server timeout after {config.timeout}s", "success": False}
     except Exception as e:
         return {"error": str(e), "success": False}
 
@@ -361,129 +352,90 @@ def sync_mcp_server_tools(server_name: str) -> dict:
     Returns:
         dict: Result with success status and tool count
     """
-    try:
-        mcp_server = frappe.get_doc("MCP Server", server_name)
-        headers = _build_mcp_headers(mcp_server)
-        
-        # Try to use LiteLLM's MCP client
-        # try:
-        #     tools = _sync_tools_via_litellm(mcp_server, headers)
-        # except ImportError:
-            # Fallback to direct HTTP
-        tools = _sync_tools_via_http(mcp_server, headers)
-        
-        # Cache tools in the document
-        mcp_server.available_tools = json.dumps(tools, indent=2)
-        mcp_server.last_sync = now_datetime()
-        
-        # Sync tools to child table
-        current_tools = {t.tool_name: t for t in mcp_server.tools}
-        synced_tool_names = set()
-        
-        for tool_def in tools:
-            # Handle both OpenAI format and direct format
-            if isinstance(tool_def, dict) and "function" in tool_def:
-                func_def = tool_def["function"]
-            else:
-                func_def = tool_def
-                
-            tool_name = func_def.get("name")
-            if not tool_name:
-                continue
-                
-            synced_tool_names.add(tool_name)
-            description = func_def.get("description", "")
-            parameters = json.dumps(func_def.get("parameters", {}), indent=2)
-            
-            if tool_name in current_tools:
-                # Update existing tool
-                row = current_tools[tool_name]
-                row.description = description
-                row.parameters = parameters
-            else:
-                # Add new tool
-                mcp_server.append("tools", {
-                    "tool_name": tool_name,
-                    "description": description,
-                    "parameters": parameters,
-                    "enabled": 1
-                })
-        
-        mcp_server.save(ignore_permissions=True)
-        frappe.db.commit()
-        
-        return {
-            "success": True,
-            "tool_count": len(tools),
-            "tools": [t.get("function", t).get("name", "unknown") for t in tools]
-        }
-        
-    except Exception as e:
-        frappe.log_error(
-            f"Error syncing MCP tools from {server_name}: {str(e)}",
-            "MCP Sync Error"
-        )
-        return {
-            "success": False,
-            "error": str(e)
-        }
+    return sync_mcp_servers([server_name])[server_name]
 
 
-def _sync_tools_via_litellm(mcp_server, headers: dict) -> list:
+def sync_mcp_servers(server_names: list[str]) -> dict:
     """
-    Sync tools using LiteLLM's experimental MCP client.
+    Sync tools from several MCP servers at once.
+    
+    tools/list is requested from all servers concurrently over the pooled
+    sessions, each bounded by its server's timeout, so one slow server no
+    longer holds up the others. Results are then written one server at a time.
+    
+    Args:
+        server_names: Names of MCP Server documents
+    
+    Returns:
+        dict: server name -> result with success status and tool count
     """
-    from litellm.experimental_mcp_client import load_mcp_tools
+    configs = {}
+    results = {}
+    for server_name in server_names:
+        try:
+            configs[server_name] = get_mcp_server_config(server_name)
+        except Exception as e:
+            results[server_name] = {"success": False, "error": str(e)}
     
-    # Run async function synchronously
     loop = asyncio.new_event_loop()
-    asyncio.set_event_loop(loop)
-    
     try:
-        tools = loop.run_until_complete(
-            load_mcp_tools(
-                mcp_url=mcp_server.server_url,
-                headers=headers,
-                format="openai"  # Get tools in OpenAI function format
-            )
-        )
-        return tools if tools else []
+        fetched = loop.run_until_complete(_fetch_tools_concurrently(configs))
     finally:
         loop.close()
+    
+    for server_name, tools in fetched.items():
+        try:
+            if isinstance(tools, BaseException):
+                if isinstance(tools, asyncio.TimeoutError):
+                    raise Exception(f"MCP server timeout after {configs[server_name].timeout}s")
+                raise tools
+            
+            _apply_synced_tools(server_name, tools)
+            frappe.db.commit()
+            results[server_name] = {
+                "success": True,
+                "tool_count": len(tools),
+                "tools": [t["function"]["name"] for t in tools]
+            }
+        except Exception as e:
+            frappe.db.rollback()
+            frappe.log_error(
+                f"Error syncing MCP tools from {server_name}: {str(e)}",
+                "MCP Sync Error"
+            )
+            results[server_name] = {
+                "success": False,
+                "error": str(e)
+            }
+    
+    return results
 
 
-def _sync_tools_via_http(mcp_server, headers: dict) -> list:
-    """
-    Sync tools using direct HTTP calls to MCP server.
-    """
-    import requests
-    
-    # MCP JSON-RPC format for listing tools
-    payload = {
-        "jsonrpc": "2.0",
-        "method": "tools/list",
-        "params": {},
-        "id": 1
-    }
+async def _fetch_tools_concurrently(configs: dict) -> dict:
+    """Return server name -> tools (OpenAI format), or the exception raised for that server."""
     
-    response = requests.post(
-        mcp_server.server_url,
-        json=payload,
-        headers=headers,
-        timeout=mcp_server.timeout_seconds or 30
-    )
+    async def fetch(config):
+        return await asyncio.wait_for(_fetch_mcp_tools(config), timeout=config.timeout)
     
-    response.raise_for_status()
-    result = response.json()
+    names = list(configs)
+    responses = await asyncio.gather(
+        *(fetch(configs[name]) for name in names),
+        return_exceptions=True
+    )
+    return dict(zip(names, responses))
+
+
+async def _fetch_mcp_tools(config) -> list:
+    """Request tools/list from an MCP server and convert the tools to OpenAI format."""
+    result = await mcp_request(config, "tools/list")
     
     if "error" in result:
         raise Exception(result["error"].get("message", "Unknown MCP error"))
     
-    # Convert MCP tools list to OpenAI format
-    mcp_tools = result.get("result", {}).get("tools", [])
     openai_tools = []
-    
-    for tool in mcp_tools:
+    for tool in result.get("result", {}).get("tools", []):
+        if not tool.get("name"):
+            continue
         openai_tools.append({
             "type": "function",
             "function": {
@@ -496,6 +448,95 @@ def _sync_tools_via_http(mcp_server, headers: dict) -> list:
     return openai_tools
 
 
+def _apply_synced_tools(server_name: str, tools: list) -> None:
+    """
+    Diff fetched tools against the MCP Server Tool rows and write only what changed.
+    
+    New tools are inserted and changed descriptions/parameters updated in
+    bulk, without loading and saving the whole MCP Server document. Rows of
+    tools the server no longer lists are kept, as before. The server's
+    `modified` is only bumped when rows changed, which refreshes compiled
+    agents and pooled server config that depend on it.
+    """
+    existing = {
+        row.tool_name: row
+        for row in frappe.get_all(
+            "MCP Server Tool",
+            filters={"parent": server_name, "parenttype": "MCP Server", "parentfield": "tools"},
+            fields=["name", "tool_name", "description", "parameters", "idx"]
+        )
+    }
+    next_idx = max((row.idx for row in existing.values()), default=0) + 1
+    
+    updates = {}
+    new_rows = []
+    for tool_def in tools:
+        func_def = tool_def["function"]
+        tool_name = func_def["name"]
+        description = func_def.get("description", "")
+        parameters = json.dumps(func_def.get("parameters", {}), indent=2)
+        
+        row = existing.get(tool_name)
+        if row is None:
+            new_rows.append((tool_name, description, parameters, next_idx))
+            existing[tool_name] = frappe._dict(description=description, parameters=parameters)
+            next_idx += 1
+        elif (row.description or "") != description or (row.parameters or "") != parameters:
+            updates[row.name] = {"description": description, "parameters": parameters}
+    
+    now = now_datetime()
+    user = frappe.session.user
+    if new_rows:
+        frappe.db.bulk_insert(
+            "MCP Server Tool",
+            ["name", "creation", "modified", "owner", "modified_by", "docstatus",
+             "parent", "parenttype", "parentfield", "idx",
+             "tool_name", "description", "parameters", "enabled"],
+            [
+                [frappe.generate_hash(length=10), now, now, user, user, 0,
+                 server_name, "MCP Server", "tools", idx,
+                 tool_name, description, parameters, 1]
+                for tool_name, description, parameters, idx in new_rows
+            ]
+        )
+    if updates:
+        frappe.db.bulk_update("MCP Server Tool", updates)
+    
+    changed = bool(new_rows or updates)
+    frappe.db.set_value(
+        "MCP Server",
+        server_name,
+        {
+            "available_tools": json.dumps(tools, indent=2),
+            "last_sync": now,
+        },
+        update_modified=changed
+    )
+
+
+def _sync_tools_via_litellm(mcp_server, headers: dict) -> list:
+    """
+    Sync tools using LiteLLM's experimental MCP client.
+    """
+    from litellm.experimental_mcp_client import load_mcp_tools
+    
+    # Run async function synchronously
+    loop = asyncio.new_event_loop()
+    asyncio.set_event_loop(loop)
+    
+    try:
+        tools = loop.run_until_complete(
+            load_mcp_tools(
+                mcp_url=mcp_server.server_url,
+                headers=headers,
+                format="openai"  # Get tools in OpenAI function format
+            )
+        )
+        return tools if tools else []
+    finally:
+        loop.close()
+
+
 @frappe.whitelist()
 def test_mcp_connection(server_name: str) -> dict:
     """
@@ -650,11 +691,18 @@ def auto_sync_mcp_server_tools():
         fields=["name", "auto_sync_interval", "last_sync"]
     )
     
-    for server in servers:
-        try:
-            # Check if sync is due
-            if not server.last_sync or time_diff_in_hours(now_datetime(), server.last_sync) >= server.auto_sync_interval:
-                frappe.log_error(f"Auto-syncing MCP Tools: {server.name}", "MCP Tools Auto Synced")
-                sync_mcp_server_tools(server.name)
-        except Exception as e:
-            frappe.log_error(f"Error auto-syncing {server.name}: {str(e)}", "MCP Tools Auto Sync Error")
+    due = [
+        server.name
+        for server in servers
+        if not server.last_sync
+        or time_diff_in_hours(now_datetime(), server.last_sync) >= server.auto_sync_interval
+    ]
+    if not due:
+        return
+    
+    for server_name, result in sync_mcp_servers(due).items():
+        if not result.get("success"):
+            frappe.log_error(
+                f"Error auto-syncing {server_name}: {result.get('error')}",
+                "MCP Tools Auto Sync Error"
+            )
@@ -0,0 +1,196 @@
+# Copyright (c) 2025, Tridz Technologies Pvt Ltd
+# For license information, please see license.txt
+
+"""
+Per-worker MCP connection manager.
+
+Each worker process keeps one aiohttp session per MCP server, with
+keep-alive connections, on a dedicated event-loop thread. Agent runs create
+a fresh event loop each time, so sessions cannot live on the caller's loop;
+callers await requests that run on the manager's loop instead. TCP/TLS
+handshakes are then paid once per worker, not once per tool call.
+
+Server config (URL, timeout and headers, including the decrypted auth value)
+is cached per worker as well and rebuilt when the MCP Server's `modified`
+changes or when it is saved in this process. Streamable-HTTP session ids
+(`Mcp-Session-Id`) returned by a server are reused on later requests.
+"""
+
+import asyncio
+import itertools
+import json
+import threading
+from types import SimpleNamespace
+
+import frappe
+
+MCP_SESSION_HEADER = "Mcp-Session-Id"
+CONNECTIONS_PER_SERVER = 20
+KEEPALIVE_SECONDS = 60
+
+# (site, server_name) -> server config namespace
+_server_configs = {}
+_config_lock = threading.Lock()
+_manager = None
+
+
+def get_mcp_server_config(server_name):
+    """Return the cached connection config of an MCP Server, rebuilding it when the doc changed."""
+    key = (frappe.local.site, server_name)
+    modified = frappe.db.get_value("MCP Server", server_name, "modified")
+    if modified is None:
+        raise frappe.DoesNotExistError(f"MCP Server {server_name} not found")
+
+    config = _server_configs.get(key)
+    if config and config.modified == modified:
+        return config
+
+    from huf.ai.mcp_client import _build_mcp_headers
+
+    mcp_server = frappe.get_doc("MCP Server", server_name)
+    config = SimpleNamespace(
+        key=key,
+        name=mcp_server.name,
+        server_url=mcp_server.server_url,
+        timeout=mcp_server.timeout_seconds or 30,
+        headers=_build_mcp_headers(mcp_server),
+        modified=modified,
+    )
+    with _config_lock:
+        _server_configs[key] = config
+    return config
+
+
+def invalidate_mcp_server_config(doc=None, method=None):
+    """doc_events hook: drop this worker's cached config and session for the saved server."""
+    key = (frappe.local.site, doc.name)
+    with _config_lock:
+        _server_configs.pop(key, None)
+    if _manager is not None:
+        _manager.close_session(key)
+
+
+def get_mcp_connection_manager():
+    global _manager
+    if _manager is None or not _manager.is_alive():
+        with _config_lock:
+            if _manager is None or not _manager.is_alive():
+                _manager = MCPConnectionManager()
+    return _manager
+
+
+async def mcp_request(config, method, params=None, timeout=None):
+    """Send a JSON-RPC request to an MCP server over the pooled session and return the parsed response."""
+    return await get_mcp_connection_manager().request(config, method, params, timeout)
+
+
+class MCPConnectionManager:
+    """Owns the event-loop thread and the pooled aiohttp sessions of one worker process."""
+
+    def __init__(self):
+        self.loop = asyncio.new_event_loop()
+        self._sessions = {}       # config.key -> aiohttp.ClientSession
+        self._mcp_sessions = {}   # config.key -> Mcp-Session-Id
+        self._ids = itertools.count(1)
+        self._thread = threading.Thread(
+            target=self._run, name="huf-mcp-pool", daemon=True
+        )
+        self._thread.start()
+
+    def _run(self):
+        asyncio.set_event_loop(self.loop)
+        self.loop.run_forever()
+
+    def is_alive(self):
+        return self._thread.is_alive() and not self.loop.is_closed()
+
+    async def request(self, config, method, params=None, timeout=None):
+        """Run the request on the manager loop and await it from the caller's loop."""
+        future = asyncio.run_coroutine_threadsafe(
+            self._request(config, method, params or {}, timeout or config.timeout),
+            self.loop,
+        )
+        return await asyncio.wrap_future(future)
+
+    def close_session(self, key):
+        if self.is_alive():
+            asyncio.run_coroutine_threadsafe(self._close_session(key), self.loop)
+
+    async def _close_session(self, key):
+        self._mcp_sessions.pop(key, None)
+        session = self._sessions.pop(key, None)
+        if session is not None and not session.closed:
+            await session.close()
+
+    def _get_session(self, key):
+        import aiohttp
+
+        session = self._sessions.get(key)
+        if session is None or session.closed:
+            connector = aiohttp.TCPConnector(
+                limit_per_host=CONNECTIONS_PER_SERVER,
+                keepalive_timeout=KEEPALIVE_SECONDS,
+                ttl_dns_cache=300,
+            )
+            session = aiohttp.ClientSession(connector=connector)
+            self._sessions[key] = session
+        return session
+
+    async def _request(self, config, method, params, timeout, retry=True):
+        import aiohttp
+
+        payload = {
+            "jsonrpc": "2.0",
+            "method": method,
+            "params": params,
+            "id": next(self._ids),
+        }
+        headers = {**config.headers, "Accept": "application/json, text/event-stream"}
+        mcp_session_id = self._mcp_sessions.get(config.key)
+        if mcp_session_id:
+            headers[MCP_SESSION_HEADER] = mcp_session_id
+
+        session = self._get_session(config.key)
+        async with session.post(
+            config.server_url,
+            json=payload,
+            headers=headers,
+            timeout=aiohttp.ClientTimeout(total=timeout),
+        ) as response:
+            if response.status == 404 and mcp_session_id and retry:
+                # The server dropped our streamable-HTTP session; start a new one
+                self._mcp_sessions.pop(config.key, None)
+                return await self._request(config, method, params, timeout, retry=False)
+
+            if response.headers.get(MCP_SESSION_HEADER):
+                self._mcp_sessions[config.key] = response.headers[MCP_SESSION_HEADER]
+
+            if response.status != 200:
+                error_text = await response.text()
+                raise MCPHTTPError(response.status, error_text)
+
+            if response.content_type == "text/event-stream":
+                return _parse_event_stream(await response.text(), payload["id"])
+            return await response.json(content_type=None)
+
+
+class MCPHTTPError(Exception):
+    def __init__(self, status, text):
+        super().__init__(f"MCP server returned status {status}: {text}")
+        self.status = status
+
+
+def _parse_event_stream(body, request_id):
+    """Pick the JSON-RPC response for request_id out of a streamable-HTTP SSE body."""
+    last = None
+    for line in body.splitlines():
+        if not line.startswith("data:"):
+            continue
+        try:
+            message = json.loads(line[5:].strip())
+        except ValueError:
+            continue
+        if isinstance(message, dict) and message.get("id") == request_id:
+            return message
+        last = message
+    return last or {}
@@ -0,0 +1,145 @@
+# Copyright (c) 2025, Tridz Technologies Pvt Ltd
+# For license information, please see license.txt
+
+"""
+Result cache for MCP tools marked cacheable on their MCP Server Tool row.
+
+Results are keyed on (server, tool, canonical arguments) and kept for the
+tool's TTL in two levels: a small per-worker dict, so repeated calls within
+a worker return without any I/O, and Redis, so other workers share them.
+Hit/miss counters per server are kept in Redis and shown on the MCP Server
+form; they are counted in memory and flushed every few seconds so a local
+hit stays free of I/O.
+"""
+
+import hashlib
+import json
+import threading
+import time
+from collections import Counter, OrderedDict
+
+import frappe
+
+CACHE_PREFIX = "huf:mcp_result"
+STATS_PREFIX = "huf:mcp_result_stats"
+LOCAL_MAX_ENTRIES = 1024
+STATS_FLUSH_SECONDS = 5
+
+# redis key -> (expires_at, result)
+_local = OrderedDict()
+_local_lock = threading.Lock()
+
+# stats redis key -> Counter of hits/misses not yet flushed
+_pending_stats = {}
+_last_stats_flush = 0.0
+
+
+def make_cache_key(server_name, tool_name, arguments):
+    canonical = json.dumps(arguments or {}, sort_keys=True, separators=(",", ":"), default=str)
+    digest = hashlib.sha256(canonical.encode()).hexdigest()
+    return frappe.cache().make_key(f"{CACHE_PREFIX}:{server_name}:{tool_name}:{digest}")
+
+
+def get_cached_result(server_name, tool_name, arguments):
+    """Return (hit, result) for a tool call and count the hit or miss."""
+    key = make_cache_key(server_name, tool_name, arguments)
+    now = time.monotonic()
+
+    with _local_lock:
+        entry = _local.get(key)
+        if entry and entry[0] > now:
+            _local.move_to_end(key)
+        else:
+            entry = None
+
+    if entry:
+        _record(server_name, "hits")
+        return True, entry[1]
+
+    try:
+        value = frappe.cache().get(key)
+        if value is not None:
+            ttl = frappe.cache().ttl(key)
+            result = json.loads(value)
+            _remember(key, result, ttl if ttl and ttl > 0 else 1)
+            _record(server_name, "hits")
+            return True, result
+    except Exception:
+        frappe.log_error(frappe.get_traceback(), "MCP Result Cache Error")
+
+    _record(server_name, "misses")
+    return False, None
+
+
+def set_cached_result(server_name, tool_name, arguments, result, ttl):
+    key = make_cache_key(server_name, tool_name, arguments)
+    _remember(key, result, ttl)
+    try:
+        frappe.cache().set(key, json.dumps(result, default=str), ex=ttl)
+    except Exception:
+        frappe.log_error(frappe.get_traceback(), "MCP Result Cache Error")
+
+
+@frappe.whitelist()
+def get_cache_stats(server_name: str) -> dict:
+    """Hit/miss counters of the result cache for an MCP server."""
+    frappe.has_permission("MCP Server", "read", server_name, throw=True)
+    flush_stats()
+    stats = frappe.cache().hgetall(_stats_key(server_name)) or {}
+    hits = int(stats.get(b"hits") or stats.get("hits") or 0)
+    misses = int(stats.get(b"misses") or stats.get("misses") or 0)
+    total = hits + misses
+    return {
+        "hits": hits,
+        "misses": misses,
+        "hit_rate": (hits / total * 100) if total else 0,
+    }
+
+
+@frappe.whitelist()
+def reset_cache_stats(server_name: str) -> None:
+    frappe.has_permission("MCP Server", "write", server_name, throw=True)
+    key = _stats_key(server_name)
+    with _local_lock:
+        _pending_stats.pop(key, None)
+    frappe.cache().delete(key)
+
+
+def _remember(key, result, ttl):
+    with _local_lock:
+        _local[key] = (time.monotonic() + ttl, result)
+        _local.move_to_end(key)
+        while len(_local) > LOCAL_MAX_ENTRIES:
+            _local.popitem(last=False)
+
+
+def flush_stats():
+    """Write counted hits/misses to Redis."""
+    global _last_stats_flush
+    with _local_lock:
+        pending = dict(_pending_stats)
+        _pending_stats.clear()
+        _last_stats_flush = time.monotonic()
+
+    if not pending:
+        return
+    try:
+        pipe = frappe.cache().pipeline()
+        for key, counts in pending.items():
+            for counter, value in counts.items():
+                pipe.hincrby(key, counter, value)
+        pipe.execute()
+    except Exception:
+        pass
+
+
+def _record(server_name, counter):
+    with _local_lock:
+        _pending_stats.setdefault(_stats_key(server_name), Counter())[counter] += 1
+        due = time.monotonic() - _last_stats_flush >= STATS_FLUSH_SECONDS
+    if due:
+        flush_stats()
+
+
+def _stats_key(server_name):
+    return frappe.cache().make_key(f"{STATS_PREFIX}:{server_name}")
@@ -18,23 +18,27 @@ Features:
 import asyncio
 import json
 import os
+from functools import partial
 from types import SimpleNamespace
 
 import frappe
 import litellm
 from litellm import InternalServerError, RateLimitError, APIError, BadRequestError, completion_cost
-from litellm.utils import supports_prompt_caching, trim_messages
+from litellm.utils import supports_prompt_caching
+from huf.ai.context_budget import ContextBudget
 from huf.ai.tool_serializer import serialize_tools
+from huf.ai import response_cache
 
 
 class SimpleResult:
     """Result structure for provider responses"""
 
-    def __init__(self, final_output, usage=None, new_items=None, cost=0.0):
+    def __init__(self, final_output, usage=None, new_items=None, cost=0.0, cache_hit=False):
         self.final_output = final_output
         self.usage = usage or {}
         self.new_items = new_items or []
         self.cost = cost
+        self.cache_hit = cache_hit
 
 
 # High-performance in-memory cache for provider capabilities
@@ -47,11 +51,180 @@ async def _execute_tool_call(tool, args_json, context=None):
     return await tool.on_invoke_tool(ctx=context, args_json=args_json)
 
 
+def _build_context_budget(messages, model):
+    """
+    Track a run's initial messages in a ContextBudget.
+
+    The leading system message is the agent's instructions, other system
+    messages are summaries / memory, and the last message is the current
+    prompt (with any injected knowledge); those are never evicted.
+    """
+    budget = ContextBudget(model)
+    last = len(messages) - 1
+    for index, message in enumerate(messages):
+        if index == last:
+            category = "prompt"
+        elif message.get("role") == "system":
+            category = "system" if index == 0 else "summary"
+        else:
+            category = "history"
+        budget.append(message, category)
+    return budget
+
+
 def _find_tool(agent, tool_name):
     """Find a tool by name in the agent's tools"""
     return next((t for t in agent.tools if t.name == tool_name), None)
 
 
+def _get_tool_concurrency(agent) -> int:
+    """Maximum number of tool calls of one turn that may run at the same time"""
+    try:
+        return max(int(getattr(agent, "max_parallel_tool_calls", 1) or 1), 1)
+    except (TypeError, ValueError):
+        return 1
+
+
+def _publish_tool_call_started(context, tool_call_id, tool_name, tool_args):
+    """Emit socket event for tool execution start BEFORE executing"""
+    if not (context and context.get("conversation_id")):
+        return
+
+    frappe.publish_realtime(
+        event=f'conversation:{context.get("conversation_id")}',
+        message={
+            "type": "tool_call_started",
+            "conversation_id": context.get("conversation_id"),
+            "agent_run_id": context.get("agent_run_id"),
+            "tool_call_id": tool_call_id,  # Use LLM's tool_call.id as temporary ID
+            "message_id": tool_call_id,  # Temporary ID, will be updated after message creation
+            "tool_name": tool_name,
+            "tool_status": "Queued",
+            "tool_args": tool_args if isinstance(tool_args, dict) else json.loads(tool_args) if isinstance(tool_args, str) else {},
+        },
+        user=frappe.session.user,
+        after_commit=False
+    )
+    frappe.db.commit()
+
+
+def _update_stream_tool_status(context, tool_call_id, tool_name, result_content):
+    """Update Tool Status in DB and Emit Event after a streamed tool call completes"""
+    if not (context and context.get("conversation_id")):
+        return
+
+    try:
+        tool_call_doc = frappe.db.get_value("Agent Tool Call", {
+            "conversation": context.get("conversation_id"),
+            "call_id": tool_call_id
+        }, "name")
+
+        if not tool_call_doc:
+            return
+
+        frappe.db.set_value("Agent Tool Call", tool_call_doc, {
+            "status": "Completed",
+            "tool_result": str(result_content)[:140000],
+        }, update_modified=False)
+
+        message_name = frappe.db.get_value("Agent Message", {"tool_calll": tool_call_doc}, "name")
+        if message_name:
+            msg_doc = frappe.get_doc("Agent Message", message_name)
+            result_str = json.dumps(result_content) if not isinstance(result_content, str) else str(result_content)
+
+            new_content = msg_doc.content + f"\n\n**Tool Result:**\n{result_str}"
+
+            msg_doc.content = new_content
+            msg_doc.kind = "Tool Result"
+            msg_doc.save(ignore_permissions=True)
+        else:
+            frappe.log_error(f"LiteLLM Stream: Could not find message for tool_calll='{tool_call_doc}'", "Debug Stream")
+
+        frappe.publish_realtime(
+            event=f'conversation:{context.get("conversation_id")}',
+            message={
+                "type": "tool_call_completed",
+                "tool_call_id": tool_call_id,
+                "tool_name": tool_name,
+                "status": "Completed",
+                "result": str(result_content)[:1000]
+            },
+            user=frappe.session.user,
+            after_commit=False
+        )
+
+        if getattr(frappe.local, "_realtime_log", None) is None:
+            frappe.local._realtime_log = []
+        frappe.db.commit()
+    except AttributeError:
+        pass
+    except Exception as e:
+        frappe.log_error(f"Error updating tool status: {str(e)}", "LiteLLM Stream Tool Status Error")
+
+
+async def _execute_tool_calls(agent, tool_calls, context=None, on_complete=None):
+    """
+    Execute all tool calls requested by the model in a single turn.
+
+    Calls run concurrently, bounded by the agent's max_parallel_tool_calls.
+    A tool flagged with has_side_effects acts as a barrier: it runs alone,
+    after every call requested before it has finished and before any call
+    requested after it starts. With a limit of 1 calls run one by one.
+
+    Args:
+            agent: Agent object with tools (and optionally max_parallel_tool_calls)
+            tool_calls: List of (tool_call_id, tool_name, tool_args) tuples
+            context: Optional context dictionary passed to each tool
+            on_complete: Optional callback(tool_call_id, tool_name, result) run after a successful call
+
+    Returns:
+            list: Result content for each tool call, in the same order as tool_calls
+    """
+    results = [None] * len(tool_calls)
+    limit = _get_tool_concurrency(agent)
+    semaphore = asyncio.Semaphore(limit)
+
+    async def _run(index):
+        tool_call_id, tool_name, tool_args = tool_calls[index]
+        tool_to_run = _find_tool(agent, tool_name)
+
+        if not tool_to_run:
+            results[index] = f"Tool '{tool_name}' not found."
+            return
+
+        async with semaphore:
+            try:
+                _publish_tool_call_started(context, tool_call_id, tool_name, tool_args)
+                results[index] = await _execute_tool_call(tool_to_run, tool_args, context)
+            except Exception as e:
+                results[index] = f"Error executing tool {tool_name}: {str(e)}"
+                return
+
+        if on_complete:
+            on_complete(tool_call_id, tool_name, results[index])
+
+    if limit == 1 or len(tool_calls) == 1:
+        for index in range(len(tool_calls)):
+            await _run(index)
+        return results
+
+    batch = []
+    for index, (_, tool_name, _) in enumerate(tool_calls):
+        tool = _find_tool(agent, tool_name)
+        if tool and getattr(tool, "has_side_effects", False):
+            if batch:
+                await asyncio.gather(*(_run(i) for i in batch))
+                batch = []
+            await _run(index)
+        else:
+            batch.append(index)
+
+    if batch:
+        await asyncio.gather(*(_run(i) for i in batch))
+
+    return results
+
+
 def _normalize_model_name(model: str, provider: str) -> str:
     """
     Normalize model name to LiteLLM format.
@@ -259,11 +432,12 @@ async def run(agent, enhanced_prompt, provider, model, context=None):
                 ]
         
         messages.append({"role": "user", "content": user_content})
+        context_budget = _build_context_budget(messages, normalized_model)
 
         # Convert tools
         tools = None
         if getattr(agent, "tools", None):
-            tools = serialize_tools(agent.tools)
+            tools = getattr(agent, "serialized_tools", None) or serialize_tools(agent.tools)
 
         total_usage = {"input_tokens": 0, "output_tokens": 0, "cached_tokens": 0}
         total_cost = 0.0
@@ -271,6 +445,10 @@ async def run(agent, enhanced_prompt, provider, model, context=None):
 
         MAX_ROUNDS = getattr(agent, "max_turns", 10) or 10
 
+        # Opt-in exact-match response cache, only for the first round's request
+        use_response_cache = response_cache.is_response_cache_enabled(agent_doc)
+        response_cache_key = None
+
         for round_num in range(MAX_ROUNDS):
 
             # Temperature / Top P
@@ -299,14 +477,10 @@ async def run(agent, enhanced_prompt, provider, model, context=None):
                 "temperature": temperature,
             }
 
-            # Trim messages to fit context window
-            try:
-                messages = trim_messages(messages=messages, model=normalized_model)
-                completion_kwargs["messages"] = messages
-            except Exception as e:
-                frappe.log_error(f"Failed to trim messages: {str(e)}", "LiteLLM Provider")
-                # Continue with untrimmed messages if trimming fails
-                pass
+            # Fit the context window; counts are cached, so this only evicts
+            # when the previous round's tool output pushed the run over budget
+            messages = context_budget.fit()
+            completion_kwargs["messages"] = messages
 
             if context and context.get("response_format"):
                 completion_kwargs["response_format"] = context.get("response_format")
@@ -335,12 +509,16 @@ async def run(agent, enhanced_prompt, provider, model, context=None):
                 completion_kwargs["tools"] = tools
                 completion_kwargs["tool_choice"] = "auto"
 
+            if use_response_cache and round_num == 0:
+                response_cache_key = response_cache.build_cache_key(completion_kwargs)
+                cached_output = response_cache.get_cached_response(agent_doc, response_cache_key)
+                if cached_output is not None:
+                    return SimpleResult(cached_output, total_usage, all_new_items, cache_hit=True)
+
             # LiteLLM call
             try:
                 try:
-                    response = await asyncio.to_thread(
-                        litellm.completion, **completion_kwargs
-                    )
+                    response = await litellm.acompletion(**completion_kwargs)
                 except BadRequestError as e:
                     err_msg = str(e).lower()
                     conflict_keywords = [
@@ -369,9 +547,7 @@ async def run(agent, enhanced_prompt, provider, model, context=None):
                         completion_kwargs.pop("tools", None)
                         completion_kwargs.pop("tool_choice", None)
                         
-                        response = await asyncio.to_thread(
-                            litellm.completion, **completion_kwargs
-                        )
+                        response = await litellm.acompletion(**completion_kwargs)
                     else:
                         raise e
 
@@ -438,78 +614,50 @@ async def run(agent, enhanced_prompt, provider, model, context=None):
             if hasattr(choice, "tool_calls") and choice.tool_calls:
                 assistant_message["tool_calls"] = choice.tool_calls
 
-            messages.append(assistant_message)
+            context_budget.append(assistant_message, "tool")
 
             # No tool call — return final result
             if not (hasattr(choice, "tool_calls") and choice.tool_calls):
+                # Answers that needed tool calls are never cached: replaying them would skip the tools
+                if response_cache_key and round_num == 0 and choice.content:
+                    response_cache.set_cached_response(agent_doc, response_cache_key, choice.content)
                 return SimpleResult(
                     choice.content or "", total_usage, all_new_items, cost=total_cost
                 )
 
             # Handle tool calls
             tool_results = []
+            calls = [
+                (tool_call.id, tool_call.function.name, tool_call.function.arguments)
+                for tool_call in choice.tool_calls
+            ]
+            call_results = await _execute_tool_calls(agent, calls, context)
 
-            for tool_call in choice.tool_calls:
-                function_call = tool_call.function
-                tool_name = function_call.name
-                tool_args = function_call.arguments
-
+            for (tool_call_id, tool_name, tool_args), result_content in zip(calls, call_results, strict=True):
                 all_new_items.append(
                     SimpleNamespace(
                         type="tool_call_item",
-                        raw_item=SimpleNamespace(name=tool_name, arguments=tool_args, id=tool_call.id),
+                        raw_item=SimpleNamespace(name=tool_name, arguments=tool_args, id=tool_call_id),
                     )
                 )
 
-                tool_to_run = _find_tool(agent, tool_name)
-                result_content = ""
-
-                if tool_to_run:
-                    try:
-                        # Emit socket event for tool execution start BEFORE executing
-                        if context and context.get("conversation_id"):
-                            frappe.publish_realtime(
-                                event=f'conversation:{context.get("conversation_id")}',
-                                message={
-                                    "type": "tool_call_started",
-                                    "conversation_id": context.get("conversation_id"),
-                                    "agent_run_id": context.get("agent_run_id"),
-                                    "tool_call_id": tool_call.id,  # Use LLM's tool_call.id as temporary ID
-                                    "message_id": tool_call.id,  # Temporary ID, will be updated after message creation
-                                    "tool_name": tool_name,
-                                    "tool_status": "Queued",
-                                    "tool_args": tool_args if isinstance(tool_args, dict) else json.loads(tool_args) if isinstance(tool_args, str) else {},
-                                },
-                                user=frappe.session.user,
-                                after_commit=False
-                            )
-                            frappe.db.commit()
-                        
-                        result_content = await _execute_tool_call(
-                            tool_to_run, tool_args, context
-                        )
-                    except Exception as e:
-                        result_content = f"Error executing tool {tool_name}: {str(e)}"
-                else:
-                    result_content = f"Tool '{tool_name}' not found."
-
                 all_new_items.append(
                     SimpleNamespace(
                         type="tool_call_output_item",
-                        raw_item={"name": tool_name, "output": result_content},
+                        raw_item={"name": tool_name, "output": result_content, "call_id": tool_call_id},
                     )
                 )
 
                 tool_results.append(
                     {
                         "role": "tool",
-                        "tool_call_id": tool_call.id,
+                        "tool_call_id": tool_call_id,
                         "name": tool_name,
                         "content": str(result_content),
                     }
                 )
 
-            messages.extend(tool_results)
+            context_budget.extend(tool_results, "tool")
 
         return SimpleResult(
             "Agent stopped after max rounds of tool calls.",
@@ -545,9 +693,7 @@ async def get_simple_completion(model: str, messages: list, provider: str) -> st
         
         _setup_api_key(provider_name, api_key, completion_kwargs)
         
-        response = await asyncio.to_thread(
-            litellm.completion, **completion_kwargs
-        )
+        response = await litellm.acompletion(**completion_kwargs)
         
         return response.choices[0].message.content
         
@@ -573,8 +719,8 @@ async def run_stream(agent, enhanced_prompt, provider, model, context=None):
     Yields:
             dict: Streaming chunks with structure:
                     - type: "delta" | "complete" | "tool_call" | "error"
-                    - content: str (for delta)
-                    - full_response: str (accumulated response)
+                    - content: str (for delta; only the new text)
+                    - full_response: str (accumulated response, on complete only)
                     - tool_call: dict (for tool_call type)
                     - error: str (for error type)
     """
@@ -672,11 +818,12 @@ async def run_stream(agent, enhanced_prompt, provider, model, context=None):
                 ]
         
         messages.append({"role": "user", "content": user_content})
+        context_budget = _build_context_budget(messages, normalized_model)
 
         # Convert tools to OpenAI format
         tools = None
         if getattr(agent, "tools", None):
-            tools = serialize_tools(agent.tools)
+            tools = getattr(agent, "serialized_tools", None) or serialize_tools(agent.tools)
 
         # Get temperature and top_p
         temperature = None
@@ -707,13 +854,8 @@ async def run_stream(agent, enhanced_prompt, provider, model, context=None):
             "stream_options": {"include_usage": True} # Request usage stats in stream
         }
         
-        # Trim messages to fit context window
-        try:
-            messages = trim_messages(messages=messages, model=normalized_model)
-            completion_kwargs["messages"] = messages
-        except Exception as e:
-            frappe.log_error(f"Failed to trim messages: {str(e)}", "LiteLLM Provider")
-            pass
+        messages = context_budget.fit()
+        completion_kwargs["messages"] = messages
 
         if top_p:
             completion_kwargs["top_p"] = top_p
@@ -731,11 +873,12 @@ async def run_stream(agent, enhanced_prompt, provider, model, context=None):
 
         for round_num in range(MAX_ROUNDS):
             try:
-                # Use LiteLLM completion with stream=True
-                # LiteLLM completion() supports streaming when stream=True
-                stream = await asyncio.to_thread(
-                    litellm.completion, **completion_kwargs
-                )
+                # Tool output added by the previous round may need evicting
+                context_budget.fit()
+
+                # Use LiteLLM's native async client with stream=True so the
+                # event loop is free between chunks (no worker thread per call)
+                stream = await litellm.acompletion(**completion_kwargs)
 
                 # Buffer for tool calls
                 current_tool_calls = {}
@@ -744,7 +887,7 @@ async def run_stream(agent, enhanced_prompt, provider, model, context=None):
                 # Process streaming chunks
                 stream_usage = None
                 
-                for chunk in stream:
+                async for chunk in stream:
                     # Capture usage if present (often in last chunk)
                     chunk_usage = getattr(chunk, "usage", None)
                     if not chunk_usage and isinstance(chunk, dict):
@@ -765,10 +908,11 @@ async def run_stream(agent, enhanced_prompt, provider, model, context=None):
                         streaming_content += delta.content
                         full_response += delta.content
 
+                        # Delta only: resending the accumulated text per token makes
+                        # long answers quadratic to serialize and send
                         yield {
                             "type": "delta",
                             "content": delta.content,
-                            "full_response": full_response,
                         }
 
                     # Handle tool call delta
@@ -813,110 +957,35 @@ async def run_stream(agent, enhanced_prompt, provider, model, context=None):
                                 }
 
                             # Execute tool calls
-                            tool_results = []
-                            for tool_call in tool_calls_list:
-                                function_call = tool_call["function"]
-                                tool_name = function_call["name"]
-                                tool_args = function_call["arguments"]
-
-                                tool_to_run = _find_tool(agent, tool_name)
-                                result_content = ""
-
-                                if tool_to_run:
-                                    try:
-                                        # Emit socket event for tool execution start BEFORE executing
-                                        if context and context.get("conversation_id"):
-                                            frappe.publish_realtime(
-                                                event=f'conversation:{context.get("conversation_id")}',
-                                                message={
-                                                    "type": "tool_call_started",
-                                                    "conversation_id": context.get("conversation_id"),
-                                                    "agent_run_id": context.get("agent_run_id"),
-                                                    "tool_call_id": tool_call["id"],  # Use LLM's tool_call.id as temporary ID
-                                                    "message_id": tool_call["id"],  # Temporary ID, will be updated after message creation
-                                                    "tool_name": tool_name,
-                                                    "tool_status": "Queued",
-                                                    "tool_args": tool_args if isinstance(tool_args, dict) else json.loads(tool_args) if isinstance(tool_args, str) else {},
-                                                },
-                                                user=frappe.session.user,
-                                                after_commit=False
-                                            )
-                                            frappe.db.commit()
-                                        
-                                        result_content = await _execute_tool_call(
-                                            tool_to_run, tool_args, context
-                                        )
-                                        
-                                        # Update Tool Status in DB and Emit Event
-                                        if context and context.get("conversation_id"):
-                                            try:
-                                                tool_call_doc = frappe.db.get_value("Agent Tool Call", {
-                                                    "conversation": context.get("conversation_id"),
-                                                    "call_id": tool_call["id"]
-                                                }, "name")
-                                                
-                                                if tool_call_doc:
-                                                    frappe.db.set_value("Agent Tool Call", tool_call_doc, {
-                                                        "status": "Completed",
-                                                        "tool_result": str(result_content)[:140000],
-                                                    }, update_modified=False)
-                                                    
-                                                    message_name = frappe.db.get_value("Agent Message", {"tool_calll": tool_call_doc}, "name")
-                                                    if message_name:
-                                                        msg_doc = frappe.get_doc("Agent Message", message_name)
-                                                        result_str = json.dumps(result_content) if not isinstance(result_content, str) else str(result_content)
-                                                        
-                                                        new_content = msg_doc.content + f"\n\n**Tool Result:**\n{result_str}"
-                                                        
-                                                        msg_doc.content = new_content
-                                                        msg_doc.kind = "Tool Result"
-                                                        msg_doc.save(ignore_permissions=True)
-                                                    else:
-                                                        frappe.log_error(f"LiteLLM Stream: Could not find message for tool_calll='{tool_call_doc}'", "Debug Stream")
-                                                    
-                                                    frappe.publish_realtime(
-                                                        event=f'conversation:{context.get("conversation_id")}',
-                                                        message={
-                                                            "type": "tool_call_completed",
-                                                            "tool_call_id": tool_call["id"],
-                                                            "tool_name": tool_name,
-                                                            "status": "Completed",
-                                                            "result": str(result_content)[:1000]
-                                                        },
-                                                        user=frappe.session.user,
-                                                        after_commit=False
-                                                    )
-                                                    
-                                                    if getattr(frappe.local, "_realtime_log", None) is None:
-                                                        frappe.local._realtime_log = []
-                                                    frappe.db.commit()
-                                            except AttributeError:
-                                                pass
-                                            except Exception as e:
-                                                print(f"Error updating tool status: {e}")
-                                    except Exception as e:
-                                        result_content = f"Error executing tool {tool_name}: {str(e)}"
-                                else:
-                                    result_content = f"Tool '{tool_name}' not found."
-
-                                tool_results.append(
-                                    {
-                                        "role": "tool",
-                                        "tool_call_id": tool_call["id"],
-                                        "name": tool_name,
-                                        "content": str(result_content),
-                                    }
-                                )
+                            calls = [
+                                (tc["id"], tc["function"]["name"], tc["function"]["arguments"])
+                                for tc in tool_calls_list
+                            ]
+                            call_results = await _execute_tool_calls(
+                                agent, calls, context,
+                                on_complete=partial(_update_stream_tool_status, context),
+                            )
+
+                            tool_results = [
+                                {
+                                    "role": "tool",
+                                    "tool_call_id": tool_call_id,
+                                    "name": tool_name,
+                                    "content": str(result_content),
+                                }
+                                for (tool_call_id, tool_name, _), result_content in zip(calls, call_results, strict=True)
+                            ]
 
                             # Add tool results to messages and continue
-                            messages.append(
+                            context_budget.append(
                                 {
                                     "role": "assistant",
                                     "content": streaming_content,
                                     "tool_calls": tool_calls_list,
-                                }
+                                },
+                                "tool",
                             )
-                            messages.extend(tool_results)
+                            context_budget.extend(tool_results, "tool")
 
                             # Reset for next round
                             streaming_content = ""
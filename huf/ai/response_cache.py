@@ -0,0 +1,123 @@
+import hashlib
+import json
+import time
+
+import frappe
+from frappe.utils import cint
+
+CACHE_PREFIX = "huf:response_cache"
+DEFAULT_TTL = 3600
+DEFAULT_MAX_ENTRIES = 500
+
+
+def is_response_cache_enabled(agent_doc):
+    return bool(agent_doc and agent_doc.get("enable_response_cache"))
+
+
+def build_cache_key(completion_kwargs):
+    """
+    Exact-match key for a completion request.
+
+    Covers the normalized messages, a hash of the tool schemas, the model and
+    the sampling params. Credentials and provider routing are left out.
+    """
+    tools = completion_kwargs.get("tools")
+    tools_hash = hashlib.sha256(
+        json.dumps(tools, sort_keys=True, default=str).encode()
+    ).hexdigest() if tools else None
+
+    payload = {
+        "model": completion_kwargs.get("model"),
+        "temperature": completion_kwargs.get("temperature"),
+        "top_p": completion_kwargs.get("top_p"),
+        "response_format": completion_kwargs.get("response_format"),
+        "tools": tools_hash,
+        "messages": [_normalize_message(m) for m in completion_kwargs.get("messages") or []],
+    }
+    return hashlib.sha256(
+        json.dumps(payload, sort_keys=True, default=str).encode()
+    ).hexdigest()
+
+
+def get_cached_response(agent_doc, key):
+    """Return the cached final output for key, or None. A hit refreshes its LRU position."""
+    cache = frappe.cache()
+    index_key = _index_key(agent_doc.name)
+    try:
+        value = cache.get(_entry_key(agent_doc.name, key))
+        if value is None:
+            cache.zrem(index_key, key)
+            return None
+        cache.zadd(index_key, {key: time.time()})
+        return json.loads(value)["output"]
+    except Exception:
+        frappe.log_error(frappe.get_traceback(), "Agent Response Cache Error")
+        return None
+
+
+def set_cached_response(agent_doc, key, output):
+    """Store a final output under key, evicting the least recently used entries over the limit."""
+    ttl = cint(agent_doc.get("response_cache_ttl")) or DEFAULT_TTL
+    max_entries = cint(agent_doc.get("response_cache_max_entries")) or DEFAULT_MAX_ENTRIES
+    cache = frappe.cache()
+    index_key = _index_key(agent_doc.name)
+    now = time.time()
+
+    try:
+        pipe = cache.pipeline()
+        pipe.set(_entry_key(agent_doc.name, key), json.dumps({"output": output}), ex=ttl)
+        pipe.zadd(index_key, {key: now})
+        # Entries not read for a full TTL have expired on their own
+        pipe.zremrangebyscore(index_key, "-inf", now - ttl)
+        pipe.expire(index_key, ttl)
+        pipe.zcard(index_key)
+        size = pipe.execute()[-1]
+
+        if size > max_entries:
+            evicted = cache.zpopmin(index_key, size - max_entries)
+            if evicted:
+                cache.delete(*[_entry_key(agent_doc.name, _decode(k)) for k, _ in evicted])
+    except Exception:
+        frappe.log_error(frappe.get_traceback(), "Agent Response Cache Error")
+
+
+def clear_agent_response_cache(doc=None, method=None):
+    """doc_events hook: drop every cached response of the saved or deleted Agent."""
+    cache = frappe.cache()
+    index_key = _index_key(doc.name)
+    try:
+        keys = [_entry_key(doc.name, _decode(k)) for k in cache.zrange(index_key, 0, -1)]
+        cache.delete(index_key, *keys)
+    except Exception:
+        frappe.log_error(frappe.get_traceback(), "Agent Response Cache Error")
+
+
+def _normalize_message(message):
+    if not isinstance(message, dict):
+        return message
+
+    content = message.get("content")
+    if isinstance(content, str):
+        content = " ".join(content.split())
+    elif isinstance(content, list):
+        # Drop prompt caching markers; they do not change the answer
+        content = [
+            {k: (" ".join(v.split()) if k == "text" and isinstance(v, str) else v)
+                for k, v in part.items() if k != "cache_control"}
+            if isinstance(part, dict) else part
+            for part in content
+        ]
+
+    return {**message, "content": content}
+
+
+def _entry_key(agent_name, key):
+    return frappe.cache().make_key(f"{CACHE_PREFIX}:{agent_name}:{key}")
+
+
+def _index_key(agent_name):
+    return frappe.cache().make_key(f"{CACHE_PREFIX}:{agent_name}")
+
+
+def _decode(value):
+    return value.decode() if isinstance(value, bytes) else value
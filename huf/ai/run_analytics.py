@@ -0,0 +1,314 @@
+import json
+from collections import defaultdict
+
+import frappe
+from frappe import _
+from frappe.utils import add_to_date, cint, flt, get_datetime, now_datetime
+
+WATERMARK_KEY = "huf_run_rollup_watermark"
+STALE_HOURS_KEY = "huf:run_rollup_stale_hours"
+DIMENSIONS = ("agent", "model", "provider")
+
+# Upper bounds (seconds) of the duration histogram buckets; one extra open-ended
+# bucket catches everything above the last bound. Keeping a histogram per row
+# lets hourly rows be merged into daily rows (and any range) with p50/p95 intact.
+DURATION_BUCKETS = (0.25, 0.5, 1, 2, 3, 5, 8, 13, 20, 30, 45, 60, 90, 120, 180, 300, 600, 1200)
+
+# How far back the first run backfills, and how far each run re-reads before the
+# watermark so runs committed late (modified set before commit) are not missed.
+BACKFILL_DAYS = 90
+WATERMARK_OVERLAP_MINUTES = 10
+
+RUN_FIELDS = [
+    "agent", "model", "provider", "status", "start_time", "end_time",
+    "input_tokens", "output_tokens", "cost",
+]
+
+
+def update_run_rollups():
+    """
+    Scheduler job: refresh Agent Run Rollup rows touched since the last run.
+
+    Every hour that contains a run modified since the watermark is recomputed
+    from Agent Run, then the days containing those hours are recomputed from
+    their hourly rows. Recomputing whole periods keeps the job idempotent.
+
+    Deleted runs leave nothing to find by `modified`; Agent Run marks their
+    hour stale on delete (see mark_rollup_stale) and it is recomputed here.
+    Runs removed with frappe.db.delete bypass that hook; call
+    rebuild_rollup for the affected periods after such a cleanup.
+    """
+    now = now_datetime()
+    watermark = frappe.db.get_global(WATERMARK_KEY)
+    if watermark:
+        since = add_to_date(get_datetime(watermark), minutes=-WATERMARK_OVERLAP_MINUTES)
+    else:
+        since = add_to_date(now, days=-BACKFILL_DAYS)
+
+    hours = {
+        _truncate(start_time, "Hourly")
+        for start_time in frappe.get_all(
+            "Agent Run",
+            filters={"modified": (">=", since), "start_time": ("is", "set")},
+            pluck="start_time",
+        )
+    }
+    hours.update(_pop_stale_hours())
+
+    for hour in sorted(hours):
+        rebuild_rollup("Hourly", hour)
+    for day in sorted({_truncate(hour, "Daily") for hour in hours}):
+        rebuild_rollup("Daily", day)
+
+    frappe.db.set_global(WATERMARK_KEY, str(now))
+    frappe.db.commit()
+
+
+def mark_rollup_stale(start_time):
+    """Queue the hour of a deleted run for recomputation by update_run_rollups."""
+    if not start_time:
+        return
+    hour = _truncate(start_time, "Hourly")
+    frappe.cache().sadd(frappe.cache().make_key(STALE_HOURS_KEY), str(hour))
+
+
+def _pop_stale_hours():
+    key = frappe.cache().make_key(STALE_HOURS_KEY)
+    pipe = frappe.cache().pipeline()
+    pipe.smembers(key)
+    pipe.delete(key)
+    members, _deleted = pipe.execute()
+    return {
+        _truncate(m.decode() if isinstance(m, bytes) else m, "Hourly")
+        for m in members or ()
+    }
+
+
+def rebuild_rollup(period, period_start):
+    """Replace the rollup rows of one hour or day."""
+    period_end = add_to_date(period_start, hours=1) if period == "Hourly" else add_to_date(period_start, days=1)
+
+    groups = defaultdict(_empty_metrics)
+    if period == "Hourly":
+        for run in frappe.get_all(
+            "Agent Run",
+            filters=[["start_time", ">=", period_start], ["start_time", "<", period_end]],
+            fields=RUN_FIELDS,
+        ):
+            _add_run(groups[tuple(run.get(d) for d in DIMENSIONS)], run)
+    else:
+        for row in _get_rollup_rows("Hourly", period_start, period_end):
+            _merge(groups[tuple(row.get(d) for d in DIMENSIONS)], row)
+
+    frappe.db.delete("Agent Run Rollup", {"period": period, "period_start": period_start})
+    if not groups:
+        return
+
+    now = now_datetime()
+    owner = frappe.session.user
+    columns = [
+        "name", "creation", "modified", "owner", "modified_by", "docstatus",
+        "period", "period_start", *DIMENSIONS,
+        "total_runs", "success_runs", "failed_runs", "timed_runs", "total_duration",
+        "p50_duration", "p95_duration", "input_tokens", "output_tokens", "total_cost",
+        "duration_histogram",
+    ]
+    values = []
+    for key, metrics in groups.items():
+        histogram = metrics["duration_histogram"]
+        values.append([
+            frappe.generate_hash(length=10), now, now, owner, owner, 0,
+            period, period_start, *key,
+            metrics["total_runs"], metrics["success_runs"], metrics["failed_runs"],
+            metrics["timed_runs"], metrics["total_duration"],
+            _percentile(histogram, 50), _percentile(histogram, 95),
+            metrics["input_tokens"], metrics["output_tokens"], metrics["total_cost"],
+            json.dumps(histogram),
+        ])
+    frappe.db.bulk_insert("Agent Run Rollup", columns, values)
+
+
+@frappe.whitelist()
+def get_run_analytics(
+    from_date=None,
+    to_date=None,
+    days=7,
+    granularity="Daily",
+    group_by=None,
+    agent=None,
+    model=None,
+    provider=None,
+) -> dict:
+    """
+    Aggregated run metrics for the dashboard, read from Agent Run Rollup.
+
+    Args:
+        from_date / to_date: Range to report on; defaults to the last `days` days
+        granularity: "Hourly" or "Daily" rollup rows (Hourly gives an hour-exact window)
+        group_by: Optional "agent", "model" or "provider" for a breakdown
+        agent / model / provider: Optional filters
+
+    Returns:
+        dict: totals, series (one entry per period) and breakdown (per group_by value).
+        Durations are in seconds; `as_of` is when the rollups were last refreshed.
+    """
+    if not frappe.has_permission("Agent Run", "read"):
+        frappe.throw(_("Not permitted to read Agent Runs"), frappe.PermissionError)
+    if granularity not in ("Hourly", "Daily"):
+        frappe.throw(_("granularity must be Hourly or Daily"))
+    if group_by and group_by not in DIMENSIONS:
+        frappe.throw(_("group_by must be one of {0}").format(", ".join(DIMENSIONS)))
+
+    to_date = get_datetime(to_date) if to_date else now_datetime()
+    from_date = get_datetime(from_date) if from_date else add_to_date(to_date, days=-cint(days))
+
+    filters = {"agent": agent, "model": model, "provider": provider}
+    rows = _get_rollup_rows(
+        granularity,
+        _truncate(from_date, granularity),
+        to_date,
+        {k: v for k, v in filters.items() if v},
+    )
+
+    totals = _empty_metrics()
+    series = defaultdict(_empty_metrics)
+    breakdown = defaultdict(_empty_metrics)
+    for row in rows:
+        _merge(totals, row)
+        _merge(series[str(row.period_start)], row)
+        if group_by:
+            _merge(breakdown[row.get(group_by)], row)
+
+    return {
+        "from_date": str(from_date),
+        "to_date": str(to_date),
+        "granularity": granularity,
+        "as_of": frappe.db.get_global(WATERMARK_KEY),
+        "totals": _summarize(totals),
+        "series": [
+            {"period_start": start, **_summarize(metrics)}
+            for start, metrics in sorted(series.items())
+        ],
+        "breakdown": [
+            {group_by: value, **_summarize(metrics)}
+            for value, metrics in sorted(breakdown.items(), key=lambda i: -i[1]["total_runs"])
+        ],
+    }
+
+
+def _get_rollup_rows(period, start, end, filters=None):
+    return frappe.get_all(
+        "Agent Run Rollup",
+        filters=[
+            ["period", "=", period],
+            ["period_start", ">=", start],
+            ["period_start", "<", end],
+            *[[field, "=", value] for field, value in (filters or {}).items()],
+        ],
+        fields=[
+            "period_start", *DIMENSIONS,
+            "total_runs", "success_runs", "failed_runs", "timed_runs", "total_duration",
+            "input_tokens", "output_tokens", "total_cost", "duration_histogram",
+        ],
+    )
+
+
+def _truncate(value, period):
+    value = get_datetime(value)
+    if period == "Daily":
+        return value.replace(hour=0, minute=0, second=0, microsecond=0)
+    return value.replace(minute=0, second=0, microsecond=0)
+
+
+def _empty_metrics():
+    return {
+        "total_runs": 0,
+        "success_runs": 0,
+        "failed_runs": 0,
+        "timed_runs": 0,
+        "total_duration": 0.0,
+        "input_tokens": 0,
+        "output_tokens": 0,
+        "total_cost": 0.0,
+        "duration_histogram": [0] * (len(DURATION_BUCKETS) + 1),
+    }
+
+
+def _add_run(metrics, run):
+    metrics["total_runs"] += 1
+    if run.status == "Success":
+        metrics["success_runs"] += 1
+    elif run.status == "Failed":
+        metrics["failed_runs"] += 1
+
+    if run.start_time and run.end_time:
+        duration = (get_datetime(run.end_time) - get_datetime(run.start_time)).total_seconds()
+        if duration >= 0:
+            metrics["timed_runs"] += 1
+            metrics["total_duration"] += duration
+            metrics["duration_histogram"][_bucket_index(duration)] += 1
+
+    metrics["input_tokens"] += cint(run.input_tokens)
+    metrics["output_tokens"] += cint(run.output_tokens)
+    metrics["total_cost"] += flt(run.cost)
+
+
+def _merge(metrics, row):
+    for field in (
+        "total_runs", "success_runs", "failed_runs", "timed_runs",
+        "input_tokens", "output_tokens",
+    ):
+        metrics[field] += cint(row.get(field))
+    metrics["total_duration"] += flt(row.get("total_duration"))
+    metrics["total_cost"] += flt(row.get("total_cost"))
+
+    histogram = row.get("duration_histogram")
+    if isinstance(histogram, str):
+        histogram = json.loads(histogram)
+    for i, count in enumerate(histogram or []):
+        if i < len(metrics["duration_histogram"]):
+            metrics["duration_histogram"][i] += cint(count)
+
+
+def _summarize(metrics):
+    total = metrics["total_runs"]
+    histogram = metrics["duration_histogram"]
+    return {
+        "runs": total,
+        "success_runs": metrics["success_runs"],
+        "failed_runs": metrics["failed_runs"],
+        "success_rate": (metrics["success_runs"] / total * 100) if total else 0,
+        "avg_duration": (metrics["total_duration"] / metrics["timed_runs"]) if metrics["timed_runs"] else 0,
+        "p50_duration": _percentile(histogram, 50),
+        "p95_duration": _percentile(histogram, 95),
+        "input_tokens": metrics["input_tokens"],
+        "output_tokens": metrics["output_tokens"],
+        "total_tokens": metrics["input_tokens"] + metrics["output_tokens"],
+        "cost": metrics["total_cost"],
+    }
+
+
+def _bucket_index(duration):
+    for i, bound in enumerate(DURATION_BUCKETS):
+        if duration <= bound:
+            return i
+    return len(DURATION_BUCKETS)
+
+
+def _percentile(histogram, p):
+    """Estimate a percentile by interpolating inside the bucket that holds it."""
+    count = sum(histogram)
+    if not count:
+        return 0
+
+    rank = p / 100 * count
+    seen = 0
+    for i, bucket_count in enumerate(histogram):
+        if bucket_count and seen + bucket_count >= rank:
+            lower = DURATION_BUCKETS[i - 1] if i else 0
+            if i >= len(DURATION_BUCKETS):
+                return lower
+            upper = DURATION_BUCKETS[i]
+            return lower + (upper - lower) * (rank - seen) / bucket_count
+        seen += bucket_count
+    return DURATION_BUCKETS[-1]
@@ -14,6 +14,7 @@ from frappe import _
 from agents import FunctionTool
 from frappe import client
 
+from .tool_executor import run_async_tool, run_sync_tool
 from .tool_functions import (
     create_documents,update_documents,
     delete_documents,submit_document, cancel_document,
@@ -23,6 +24,16 @@ import re
 import hashlib
 from datetime import datetime, timedelta
 
+# Built-in tool types that always write data; never run in parallel with other tool calls
+SIDE_EFFECT_TOOL_TYPES = (
+    "Create Document", "Create Multiple Documents",
+    "Update Document", "Update Multiple Documents",
+    "Delete Document", "Delete Multiple Documents",
+    "Submit Document", "Cancel Document",
+    "Set Value", "POST", "Run Agent", "Attach File to Document",
+    "Set Conversation Data",
+)
+
 
 def create_agent_tools(agent) -> list[FunctionTool]:
     """
@@ -145,15 +156,22 @@ def create_agent_tools(agent) -> list[FunctionTool]:
                         if function_doc.function_name:
                             extra_args["function_name"] = function_doc.function_name
 
+                    has_side_effects = bool(
+                        function_doc.get("has_side_effects")
+                        or function_doc.types in SIDE_EFFECT_TOOL_TYPES
+                    )
                     tool = create_function_tool(
                         function_doc.tool_name,
                         function_doc.description,
                         function_path,
                         params,
                         extra_args=extra_args,
+                        timeout=function_doc.get("timeout_seconds"),
+                        side_effects=has_side_effects,
                     )
 
                     if tool:
+                        tool.has_side_effects = has_side_effects
                         tools.append(tool)
 
             except Exception as e:
@@ -198,9 +216,12 @@ def create_agent_tools(agent) -> list[FunctionTool]:
                         "source": {"type": "string", "description": "Source of data (agent/user). Default: agent"}
                     },
                     "required": ["name", "value"]
-                }
+                },
+                side_effects=True,
             )
-            if tool: tools.append(tool)
+            if tool:
+                tool.has_side_effects = True
+                tools.append(tool)
 
         # Load Conversation Data
         if "load_conversation_data" not in existing_types:
@@ -224,6 +245,8 @@ def create_function_tool(
     tool_name: str,
     parameters: dict[str, Any],
     extra_args: dict[str, Any] = None,
+    timeout: int = None,
+    side_effects: bool = False,
 ) -> FunctionTool:
     """
     Create a FunctionTool for Huf Tool functions
@@ -234,6 +257,8 @@ def create_function_tool(
 	    function_name: Function name to call
 	    parameters: Function parameters schema
 	    extra_args: Extra arguments to pass to the function
+	    timeout: Seconds before a call is abandoned (site default when None)
+	    side_effects: The tool writes data; it always runs to completion
 
 	Returns:
 	    FunctionTool: Function tool
@@ -246,7 +271,7 @@ def create_function_tool(
 
     try:
         _extra_args = extra_args or {}
-        _function = function
+        invoke = compile_tool_invoker(function, name, timeout=timeout, side_effects=side_effects)
 
         async def on_invoke_tool(ctx=None, args_json: str = None) -> str:
             try:
@@ -268,34 +293,7 @@ def create_function_tool(
                     if key not in args_dict:
                         args_dict[key] = value
 
-                if _function.__name__ in ["handle_get_request", "handle_post_request"]:
-                    args_dict["tool_name"] = name
-                import inspect
-
-                sig = inspect.signature(_function)
-                accepts_kwargs = any(
-                    p.kind == inspect.Parameter.VAR_KEYWORD 
-                    for p in sig.parameters.values()
-                )
-                if accepts_kwargs:
-                    result = _function(**args_dict)
-                else:
-                    valid_params = set(sig.parameters.keys())
-                    
-                    filtered_args = {
-                        k: v for k, v in args_dict.items() 
-                        if k in valid_params
-                    }
-                    result = _function(**filtered_args)
-                
-                # Handle async functions
-                if asyncio.iscoroutine(result):
-                    result = await result
-
-                if hasattr(result, "as_dict"):
-                    result = result.as_dict()
-
-                return json.dumps(result, default=str) if isinstance(result, (dict, list)) else str(result)
+                return await invoke(args_dict)
 
             except Exception as e:
                 frappe.log_error(f"Error in on_invoke_tool for tool '{name}': {str(e)}", "SDK Functions Debug")
@@ -323,6 +321,69 @@ def create_function_tool(
         return None
 
 
+def compile_tool_invoker(
+    function: Callable, tool_name: str = None, timeout: int = None, side_effects: bool = False
+) -> Callable:
+    """
+    Build the per-call adapter for a tool function.
+
+    The calling convention (whether it takes **kwargs, which parameters it
+    accepts, sync or async) is worked out once here, so each invocation only
+    filters the arguments, calls the function and serializes the result.
+    Sync functions run in the tool worker pool, async ones on the caller's
+    loop (see tool_executor).
+
+    Args:
+        function: Tool function
+        tool_name: Passed as `tool_name` to the generic HTTP request handlers
+        timeout: Seconds before a call is abandoned (site default when None)
+        side_effects: The tool writes data; it is never timed out, since a
+            write committed inside the tool cannot be rolled back
+
+    Returns:
+        Callable: async invoke(args_dict) -> str
+    """
+    sig = inspect.signature(function)
+    accepts_kwargs = any(
+        p.kind == inspect.Parameter.VAR_KEYWORD
+        for p in sig.parameters.values()
+    )
+    valid_params = frozenset(sig.parameters)
+    injected = {}
+    if function.__name__ in ["handle_get_request", "handle_post_request"]:
+        injected["tool_name"] = tool_name
+
+    if accepts_kwargs:
+        def bind(args_dict):
+            if injected:
+                args_dict.update(injected)
+            return args_dict
+    else:
+        def bind(args_dict):
+            if injected:
+                args_dict.update(injected)
+            return {k: v for k, v in args_dict.items() if k in valid_params}
+
+    if inspect.iscoroutinefunction(function):
+        async def invoke(args_dict: dict) -> str:
+            return _serialize_tool_result(await run_async_tool(function, bind(args_dict), timeout, side_effects))
+    else:
+        async def invoke(args_dict: dict) -> str:
+            result = await run_sync_tool(function, bind(args_dict), timeout, side_effects)
+            # Sync wrappers may still hand back a coroutine
+            if asyncio.iscoroutine(result):
+                result = await result
+            return _serialize_tool_result(result)
+
+    return invoke
+
+
+def _serialize_tool_result(result) -> str:
+    if hasattr(result, "as_dict"):
+        result = result.as_dict()
+    return json.dumps(result, default=str) if isinstance(result, (dict, list)) else str(result)
+
+
 def get_function_from_name(tool_name: str) -> Callable:
 	"""
 	Get a function from its name
@@ -1241,8 +1302,7 @@ async def handle_generate_image(
         # Call LiteLLM image generation
         import litellm
         
-        response = await asyncio.to_thread(
-            litellm.image_generation,
+        response = await litellm.aimage_generation(
             prompt=prompt,
             model=normalized_model,
             n=n,
@@ -1251,20 +1311,18 @@ async def handle_generate_image(
             api_key=api_key
         )
         
-        # Get conversation_index once if conversation_id exists
+        # Reserve one conversation_index per returned image up front
         # Each Agent Message needs a unique, sequential conversation_index to maintain order.
         conversation_index = None
-        if conversation_id:
+        if conversation_id and getattr(response, "data", None):
             try:
-                last_index = frappe.db.sql("""
-                    SELECT MAX(conversation_index) as last_index
-                    FROM `tabAgent Message`
-                    WHERE conversation = %s
-                """, (conversation_id,), as_dict=1)
-                
-                conversation_index = (last_index[0].last_index if last_index and last_index[0].last_index is not None else 0) + 1
-            except Exception:
-                conversation_index = 1
+                from huf.ai.conversation_manager import reserve_message_indexes
+                conversation_index = reserve_message_indexes(conversation_id, len(response.data))
+            except Exception as e:
+                frappe.log_error(
+                    f"Error reserving message index: {str(e)}",
+                    "Image Generation Message Creation"
+                )
         
         # Process response and save images
         images = []
@@ -1398,21 +1456,6 @@ async def handle_generate_image(
                     "file_id": file_id
                 })
         
-        # Update conversation total_messages once after all images are created
-        if conversation_id and conversation_index is not None and images:
-            try:
-                final_index = conversation_index + len(images) - 1
-                frappe.db.sql("""
-                    UPDATE `tabAgent Conversation`
-                    SET total_messages = %s, last_activity = NOW()
-                    WHERE name = %s
-                """, (final_index, conversation_id))
-            except Exception as e:
-                frappe.log_error(
-                    f"Error updating conversation total_messages: {str(e)}",
-                    "Image Generation Message Creation"
-                )
-        
         if not images:
             return {
                 "success": False,
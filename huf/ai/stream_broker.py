@@ -0,0 +1,318 @@
+"""
+Background streaming transport for agents.
+
+Generation runs in a background worker that appends every chunk to a Redis
+stream. Clients read the stream instead of holding the request that started
+the run:
+
+- SSE: `/huf/stream/<agent>` tails the Redis stream
+- socket.io: `start_agent_stream` returns a stream id and chunks are
+  published on the `agent_stream:<stream_id>` realtime event
+
+Only the socket.io path frees the web worker: the request returns as soon
+as the job is enqueued. An SSE response still holds its web worker for the
+whole stream, blocked in XREAD instead of running the agent, so it does not
+reduce web worker usage.
+
+The stream doubles as a bounded replay buffer (MAXLEN). SSE frames carry
+`<stream_id>:<entry_id>` as their event id, so a client reconnecting with
+Last-Event-ID resumes from where it left off instead of starting a new run.
+
+Delta chunks carry only new text. coalesce_deltas() merges provider deltas
+into frames by time window and byte budget; the accumulated response is only
+sent once, on the complete chunk.
+"""
+
+import asyncio
+import json
+import time
+
+import frappe
+from frappe import _
+from frappe.utils.background_jobs import enqueue
+
+STREAM_PREFIX = "huf:agent_stream"
+STREAM_TTL = 600  # seconds a finished (or abandoned) stream is kept
+STREAM_MAXLEN = 10000  # default size of the replay buffer, see get_stream_maxlen()
+TAIL_BLOCK_MS = 15000
+TAIL_IDLE_TIMEOUT = 300  # seconds without any chunk before a reader gives up
+TERMINAL_TYPES = ("complete", "error")
+
+# Delta coalescing: the first delta goes out at once (time to first token),
+# later frames wait up to a window that widens as the answer grows.
+COALESCE_MIN_WINDOW = 0.02
+COALESCE_MAX_WINDOW = 0.15
+COALESCE_MAX_BYTES = 4096
+
+
+def get_stream_key(stream_id):
+    return frappe.cache().make_key(f"{STREAM_PREFIX}:{stream_id}")
+
+
+def get_stream_owner_key(stream_id):
+    return frappe.cache().make_key(f"{STREAM_PREFIX}:{stream_id}:owner")
+
+
+def get_stream_maxlen():
+    return int(frappe.conf.get("huf_stream_maxlen") or STREAM_MAXLEN)
+
+
+def format_event_id(stream_id, entry_id):
+    """SSE event id; Redis entry ids increase monotonically within a stream."""
+    if isinstance(entry_id, bytes):
+        entry_id = entry_id.decode()
+    return f"{stream_id}:{entry_id}"
+
+
+def parse_event_id(event_id):
+    """Split a Last-Event-ID into (stream_id, entry_id); (None, None) if malformed."""
+    stream_id, sep, entry_id = (event_id or "").strip().partition(":")
+    if not (sep and stream_id and entry_id):
+        return None, None
+    return stream_id, entry_id
+
+
+def can_read_stream(stream_id, user=None):
+    """Only the user who started a stream may resume it, and only while it is buffered."""
+    owner = frappe.cache().get(get_stream_owner_key(stream_id))
+    if owner is None:
+        return False
+    if isinstance(owner, bytes):
+        owner = owner.decode()
+    return owner == (user or frappe.session.user)
+
+
+async def coalesce_deltas(stream, min_window=COALESCE_MIN_WINDOW, max_window=COALESCE_MAX_WINDOW, max_bytes=COALESCE_MAX_BYTES):
+    """
+    Merge consecutive delta chunks of an async stream into fewer frames.
+
+    Buffered text is flushed when the window since its first delta elapses
+    (even if the provider stalls), when it reaches max_bytes, or before any
+    non-delta chunk, so ordering is preserved.
+    """
+    loop = asyncio.get_running_loop()
+    iterator = stream.__aiter__()
+    buffer = []
+    size = 0
+    deadline = None
+    frames = 0
+    pending = None
+
+    def flush():
+        nonlocal buffer, size, deadline, frames
+        frame = {"type": "delta", "content": "".join(buffer)}
+        buffer, size, deadline = [], 0, None
+        frames += 1
+        return frame
+
+    try:
+        while True:
+            if pending is None:
+                pending = asyncio.ensure_future(iterator.__anext__())
+
+            timeout = None if deadline is None else max(0, deadline - loop.time())
+            done, _ = await asyncio.wait({pending}, timeout=timeout)
+            if not done:
+                yield flush()
+                continue
+
+            task, pending = pending, None
+            try:
+                chunk = task.result()
+            except StopAsyncIteration:
+                if buffer:
+                    yield flush()
+                return
+
+            if chunk.get("type") != "delta":
+                if buffer:
+                    yield flush()
+                yield chunk
+                continue
+
+            content = chunk.get("content") or ""
+            buffer.append(content)
+            size += len(content.encode())
+            if frames == 0 or size >= max_bytes:
+                yield flush()
+            elif deadline is None:
+                deadline = loop.time() + min(max_window, min_window * (1 + frames / 10))
+    finally:
+        if pending is not None:
+            pending.cancel()
+
+
+def start_stream_job(agent_name, prompt, provider, model, channel_id=None, external_id=None, conversation_id=None, realtime=False):
+    """Enqueue the agent run and return the id of the stream it writes to."""
+    stream_id = frappe.generate_hash(length=16)
+    frappe.cache().set(get_stream_owner_key(stream_id), frappe.session.user, ex=STREAM_TTL)
+    enqueue(
+        "huf.ai.stream_broker.run_stream_job",
+        queue="long",
+        timeout=3600,
+        enqueue_after_commit=False,
+        stream_id=stream_id,
+        agent_name=agent_name,
+        prompt=prompt,
+        provider=provider,
+        model=model,
+        channel_id=channel_id,
+        external_id=external_id,
+        conversation_id=conversation_id,
+        realtime=realtime,
+    )
+    return stream_id
+
+
+@frappe.whitelist()
+def start_agent_stream(agent_name, prompt, conversation_id=None, channel_id=None, external_id=None):
+    """
+    Start a streamed agent run in the background for socket.io clients.
+
+    Returns:
+        dict: stream_id; chunks are published on `agent_stream:<stream_id>`
+    """
+    if not prompt:
+        frappe.throw(_("prompt is required"))
+
+    agent_doc = frappe.get_doc("Agent", agent_name)
+    agent_doc.check_permission("read")
+    model = frappe.db.get_value("AI Model", agent_doc.model, "model_name")
+
+    stream_id = start_stream_job(
+        agent_name=agent_name,
+        prompt=prompt,
+        provider=agent_doc.provider,
+        model=model,
+        channel_id=channel_id or "socketio_stream",
+        external_id=external_id or frappe.session.user,
+        conversation_id=conversation_id,
+        realtime=True,
+    )
+    return {"stream_id": stream_id}
+
+
+@frappe.whitelist()
+def get_stream_events(stream_id, last_event_id=None):
+    """
+    Replay buffered chunks of a stream, e.g. after a socket.io reconnect.
+
+    Args:
+        stream_id: Stream returned by start_agent_stream
+        last_event_id: Last event id the client received; replay starts after it
+
+    Returns:
+        dict: events (list of {id, chunk}) and whether the stream has finished
+    """
+    if not can_read_stream(stream_id):
+        frappe.throw(_("Stream not found or expired"), frappe.DoesNotExistError)
+
+    start = "-"
+    if last_event_id:
+        _stream_id, entry_id = parse_event_id(last_event_id)
+        if _stream_id == stream_id:
+            start = f"({entry_id}"
+
+    events = []
+    finished = False
+    for entry_id, fields in frappe.cache().xrange(get_stream_key(stream_id), min=start):
+        chunk = json.loads(fields.get(b"data") or fields.get("data"))
+        events.append({"id": format_event_id(stream_id, entry_id), "chunk": chunk})
+        finished = finished or chunk.get("type") in TERMINAL_TYPES
+    return {"events": events, "finished": finished}
+
+
+def run_stream_job(stream_id, agent_name, prompt, provider, model, channel_id=None, external_id=None, conversation_id=None, realtime=False):
+    """Background job: drive run_agent_stream and append each chunk to the Redis stream."""
+    from huf.ai.agent_integration import run_agent_stream
+
+    publisher = StreamPublisher(stream_id, realtime=realtime)
+
+    async def pump():
+        async for chunk in run_agent_stream(
+            agent_name=agent_name,
+            prompt=prompt,
+            provider=provider,
+            model=model,
+            channel_id=channel_id,
+            external_id=external_id,
+            conversation_id=conversation_id,
+        ):
+            publisher.publish(chunk)
+            if chunk.get("type") in TERMINAL_TYPES:
+                break
+
+    loop = asyncio.new_event_loop()
+    try:
+        loop.run_until_complete(pump())
+    except Exception as e:
+        frappe.log_error(frappe.get_traceback(), "Huf Stream Job Error")
+        publisher.publish({"type": "error", "error": str(e)})
+    finally:
+        loop.close()
+        if not publisher.finished:
+            publisher.publish({"type": "error", "error": "Stream ended without a response"})
+
+
+class StreamPublisher:
+    """Appends chunks of one stream to Redis (and optionally to socket.io)."""
+
+    def __init__(self, stream_id, realtime=False):
+        self.stream_id = stream_id
+        self.key = get_stream_key(stream_id)
+        self.owner_key = get_stream_owner_key(stream_id)
+        self.maxlen = get_stream_maxlen()
+        self.realtime = realtime
+        self.user = frappe.session.user
+        self.finished = False
+
+    def publish(self, chunk):
+        cache = frappe.cache()
+        pipe = cache.pipeline()
+        pipe.xadd(self.key, {"data": json.dumps(chunk, default=str)}, maxlen=self.maxlen, approximate=True)
+        pipe.expire(self.key, STREAM_TTL)
+        pipe.expire(self.owner_key, STREAM_TTL)
+        entry_id = pipe.execute()[0]
+        chunk_id = format_event_id(self.stream_id, entry_id)
+
+        if self.realtime:
+            frappe.publish_realtime(
+                event=f"agent_stream:{self.stream_id}",
+                message={**chunk, "event_id": chunk_id},
+                user=self.user,
+                after_commit=False,
+            )
+
+        if chunk.get("type") in TERMINAL_TYPES:
+            self.finished = True
+
+
+def tail_stream(cache, key, last_id="0-0"):
+    """
+    Yield (entry_id, chunk) from a Redis stream until a terminal chunk.
+
+    Takes the Redis client and key up front so it can be consumed after the
+    request context is gone (e.g. by a Werkzeug streaming response). Yields
+    (None, None) while waiting so callers can send keep-alives. Reads block,
+    so the calling worker is busy until the stream ends or has been idle for
+    TAIL_IDLE_TIMEOUT.
+    """
+    idle_since = time.monotonic()
+    while True:
+        entries = cache.xread({key: last_id}, count=100, block=TAIL_BLOCK_MS)
+        if not entries:
+            if time.monotonic() - idle_since > TAIL_IDLE_TIMEOUT:
+                yield None, {"type": "error", "error": "Stream timed out"}
+                return
+            yield None, None
+            continue
+
+        idle_since = time.monotonic()
+        for _stream, items in entries:
+            for entry_id, fields in items:
+                last_id = entry_id
+                data = fields.get(b"data") or fields.get("data")
+                chunk = json.loads(data)
+                yield entry_id, chunk
+                if chunk.get("type") in TERMINAL_TYPES:
+                    return
@@ -0,0 +1,94 @@
+import frappe
+from frappe.tests.utils import FrappeTestCase
+
+from huf.patches.v1.add_hot_path_indexes import HOT_PATH_INDEXES, execute, get_index_name
+
+# Hot query shapes and the composite index each must be able to use.
+# Keep in sync when adding queries that filter these DocTypes.
+QUERY_SHAPES = [
+    (
+        "Agent Message",
+        "SELECT role, content FROM `tabAgent Message` WHERE conversation = %s ORDER BY conversation_index DESC LIMIT 20",
+        ("conv",),
+        ["conversation", "conversation_index"],
+    ),
+    (
+        "Agent Message",
+        "SELECT name FROM `tabAgent Message` WHERE tool_calll = %s",
+        ("call",),
+        ["tool_calll"],
+    ),
+    (
+        "Agent Message",
+        "SELECT name FROM `tabAgent Message` WHERE conversation = %s AND agent_run = %s AND kind = 'Image'",
+        ("conv", "run"),
+        ["conversation", "agent_run", "kind"],
+    ),
+    (
+        "Agent Tool Call",
+        "SELECT name FROM `tabAgent Tool Call` WHERE agent_run = %s AND status = 'Queued' AND call_id = %s",
+        ("run", "call"),
+        ["agent_run", "status", "call_id"],
+    ),
+    (
+        "Agent Run",
+        "SELECT start_time FROM `tabAgent Run` WHERE agent = %s ORDER BY start_time DESC LIMIT 1",
+        ("agent",),
+        ["agent", "start_time"],
+    ),
+    (
+        "Agent Conversation",
+        "SELECT name FROM `tabAgent Conversation` WHERE agent = %s AND session_id = %s AND is_active = 1",
+        ("agent", "session"),
+        ["agent", "session_id", "is_active"],
+    ),
+    (
+        "MCP Server Tool",
+        "SELECT parent FROM `tabMCP Server Tool` WHERE tool_name = %s AND enabled = 1",
+        ("tool",),
+        ["tool_name", "enabled"],
+    ),
+    (
+        "Agent Trigger",
+        "SELECT name FROM `tabAgent Trigger` WHERE trigger_type = 'Schedule' AND disabled = 0 AND next_execution <= NOW()",
+        (),
+        ["trigger_type", "disabled", "next_execution"],
+    ),
+    (
+        "Knowledge Input",
+        "SELECT name FROM `tabKnowledge Input` WHERE knowledge_source = %s AND source_hash = %s",
+        ("source", "hash"),
+        ["knowledge_source", "source_hash"],
+    ),
+]
+
+
+class TestQueryPlans(FrappeTestCase):
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        execute()
+
+    def setUp(self):
+        if frappe.db.db_type != "mariadb":
+            self.skipTest("Query plan checks are written for MariaDB EXPLAIN output")
+
+    def test_hot_path_indexes_exist(self):
+        for doctype, fields in HOT_PATH_INDEXES:
+            self.assertTrue(
+                frappe.db.has_index(f"tab{doctype}", get_index_name(fields)),
+                f"Missing index {get_index_name(fields)} on {doctype}",
+            )
+
+    def test_hot_queries_can_use_an_index(self):
+        for doctype, query, params, fields in QUERY_SHAPES:
+            plan = frappe.db.sql(f"EXPLAIN {query}", params, as_dict=True)
+            rows = [row for row in plan if row.get("table") == f"tab{doctype}"]
+            self.assertTrue(rows, f"No plan row for {doctype}: {plan}")
+
+            possible_keys = (rows[0].get("possible_keys") or "").split(",")
+            self.assertIn(
+                get_index_name(fields),
+                possible_keys,
+                f"{doctype} query cannot use {get_index_name(fields)} (would scan): {query}",
+            )
@@ -0,0 +1,73 @@
+import threading
+
+import frappe
+from frappe.tests.utils import FrappeTestCase
+
+from huf.ai.tool_executor import _run_in_site_context, get_tool_executor
+
+TEST_KEY = "_huf_test_tool_executor"
+
+
+def write_value(value):
+    frappe.db.set_global(TEST_KEY, value)
+    return {"user": frappe.session.user, "site": frappe.local.site}
+
+
+def failing_write():
+    frappe.db.set_global(TEST_KEY, "failed")
+    raise ValueError("tool failed")
+
+
+def read_value():
+    # Read the row, not the defaults cache, which a rolled back write may have cleared
+    return frappe.db.get_value("DefaultValue", {"parent": "__global", "defkey": TEST_KEY}, "defvalue")
+
+
+class TestRunInSiteContext(FrappeTestCase):
+    """Pool threads open their own connection, so every check goes through one."""
+
+    def run_pooled(self, function, kwargs=None, cancelled=None):
+        # Always on a pool thread: _run_in_site_context inits and destroys the thread's frappe.local
+        return get_tool_executor().submit(
+            _run_in_site_context,
+            function,
+            kwargs or {},
+            site=frappe.local.site,
+            sites_path=frappe.local.sites_path,
+            user=frappe.session.user,
+            lang=None,
+            timeout=None,
+            cancelled=cancelled or threading.Event(),
+        ).result(timeout=30)
+
+    def tearDown(self):
+        self.run_pooled(write_value, {"value": None})
+
+    def test_commits_as_caller(self):
+        context = self.run_pooled(write_value, {"value": "ok"})
+        self.assertEqual(context, {"user": frappe.session.user, "site": frappe.local.site})
+        self.assertEqual(self.run_pooled(read_value), "ok")
+
+    def test_rolls_back_failed_tool(self):
+        self.run_pooled(write_value, {"value": "ok"})
+        with self.assertRaises(ValueError):
+            self.run_pooled(failing_write)
+        self.assertEqual(self.run_pooled(read_value), "ok")
+
+    def test_cancelled_call(self):
+        self.run_pooled(write_value, {"value": "ok"})
+
+        cancelled = threading.Event()
+        cancelled.set()
+        self.assertIsNone(self.run_pooled(write_value, {"value": "queued"}, cancelled))
+
+        # Cancelled while running: the call finishes but its open transaction is dropped
+        cancelled = threading.Event()
+
+        def write_then_cancel():
+            write_value("running")
+            cancelled.set()
+            return "result"
+
+        self.assertIsNone(self.run_pooled(write_then_cancel, cancelled=cancelled))
+        self.assertEqual(self.run_pooled(read_value), "ok")
@@ -0,0 +1,64 @@
+import asyncio
+import json
+
+from frappe.tests.utils import FrappeTestCase
+
+from huf.ai.sdk_tools import compile_tool_invoker
+from huf.ai.tool_executor import ToolTimeoutError
+
+
+def sample_tool(doctype, name=None, fields=None):
+    return {"doctype": doctype, "name": name, "fields": fields}
+
+
+def kwargs_tool(doctype, **kwargs):
+    return {"doctype": doctype, **kwargs}
+
+
+async def async_tool(query):
+    return [query]
+
+
+async def slow_tool():
+    await asyncio.sleep(5)
+
+
+async def slow_write_tool():
+    await asyncio.sleep(1.5)
+    return "written"
+
+
+def handle_get_request(tool_name=None, **kwargs):
+    return tool_name
+
+
+class TestToolInvoker(FrappeTestCase):
+    def run_async(self, coro):
+        return asyncio.run(coro)
+
+    def test_filters_unknown_arguments(self):
+        invoke = compile_tool_invoker(sample_tool)
+        result = self.run_async(invoke({"doctype": "User", "agent_run_id": "run-1"}))
+        self.assertEqual(json.loads(result), {"doctype": "User", "name": None, "fields": None})
+
+    def test_passes_all_arguments_to_kwargs_tool(self):
+        invoke = compile_tool_invoker(kwargs_tool)
+        result = self.run_async(invoke({"doctype": "User", "agent_run_id": "run-1"}))
+        self.assertEqual(json.loads(result), {"doctype": "User", "agent_run_id": "run-1"})
+
+    def test_awaits_async_tool(self):
+        invoke = compile_tool_invoker(async_tool)
+        self.assertEqual(json.loads(self.run_async(invoke({"query": "q"}))), ["q"])
+
+    def test_injects_tool_name_for_http_handlers(self):
+        invoke = compile_tool_invoker(handle_get_request, "Weather")
+        self.assertEqual(self.run_async(invoke({})), "Weather")
+
+    def test_async_tool_timeout(self):
+        invoke = compile_tool_invoker(slow_tool, timeout=1)
+        with self.assertRaises(ToolTimeoutError):
+            self.run_async(invoke({}))
+
+    def test_side_effect_tool_is_not_timed_out(self):
+        invoke = compile_tool_invoker(slow_write_tool, timeout=1, side_effects=True)
+        self.assertEqual(self.run_async(invoke({})), "written")
@@ -0,0 +1,85 @@
+"""
+Micro-benchmark for tool invocation overhead.
+
+Compares per-call reflection (inspect.signature on every call, as
+on_invoke_tool used to do) with the adapters built by compile_tool_invoker:
+
+    bench --site test_site execute huf.ai.tool_benchmark.run \
+        --kwargs "{'calls': 20000, 'output': 'tool_bench.json'}"
+
+The tool functions are trivial, so the numbers measure the invocation path
+only, not tool work.
+"""
+
+import asyncio
+import inspect
+import json
+import platform
+import time
+from typing import Any, Dict, Optional
+
+from huf.ai.sdk_tools import _serialize_tool_result, compile_tool_invoker
+
+ARGS = {"doctype": "User", "name": "x", "conversation_id": "c", "agent_run_id": "r"}
+
+
+def sample_tool(doctype, name=None, fields=None):
+    return {"doctype": doctype, "name": name, "fields": fields}
+
+
+def kwargs_tool(doctype, **kwargs):
+    return {"doctype": doctype, **kwargs}
+
+
+async def reflective_invoke(function, args_dict):
+    """Per-call reflection as done before invokers were compiled; the baseline."""
+    sig = inspect.signature(function)
+    accepts_kwargs = any(p.kind == inspect.Parameter.VAR_KEYWORD for p in sig.parameters.values())
+    if accepts_kwargs:
+        result = function(**args_dict)
+    else:
+        valid_params = set(sig.parameters.keys())
+        result = function(**{k: v for k, v in args_dict.items() if k in valid_params})
+    if asyncio.iscoroutine(result):
+        result = await result
+    return _serialize_tool_result(result)
+
+
+async def _time_calls(invoke, calls):
+    start = time.perf_counter()
+    for _ in range(calls):
+        await invoke(dict(ARGS))
+    return time.perf_counter() - start
+
+
+def bench_function(function, calls):
+    compiled = compile_tool_invoker(function)
+
+    async def bench():
+        reflective = await _time_calls(lambda args: reflective_invoke(function, args), calls)
+        compiled_seconds = await _time_calls(compiled, calls)
+        return reflective, compiled_seconds
+
+    reflective, compiled_seconds = asyncio.run(bench())
+    return {
+        "function": function.__name__,
+        "calls": calls,
+        "reflective_us_per_call": reflective / calls * 1e6,
+        "compiled_us_per_call": compiled_seconds / calls * 1e6,
+        "speedup": reflective / compiled_seconds if compiled_seconds else None,
+    }
+
+
+def run(calls: int = 20000, output: Optional[str] = None) -> Dict[str, Any]:
+    """Run the benchmark and return the results dict."""
+    results = {
+        "meta": {"python": platform.python_version()},
+        "tools": [bench_function(function, calls) for function in (sample_tool, kwargs_tool)],
+    }
+
+    payload = json.dumps(results, indent=2)
+    if output:
+        with open(output, "w") as f:
+            f.write(payload)
+    print(payload)
+    return results
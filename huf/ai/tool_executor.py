@@ -0,0 +1,170 @@
+# Copyright (c) 2025, Tridz Technologies Pvt Ltd
+# For license information, please see license.txt
+
+"""
+Runs synchronous tool functions off the agent's event loop.
+
+Native Huf tools (get list, run report, update document, ...) are blocking,
+DB-bound functions. Called directly from on_invoke_tool they freeze the
+provider loop and every other tool call or stream running on it. Sync tools
+are dispatched to a bounded thread pool instead; async tools keep running
+natively on the loop.
+
+Each pooled call gets its own Frappe context: the thread is initialised for
+the caller's site, connects to the database and runs as the caller's user.
+Its open transaction is committed when the tool returns and rolled back when
+it fails. The provider commits before every tool call, so the tool sees the
+run's conversation and tool call rows.
+
+Timeouts only apply to tools without side effects. Async tools are cancelled
+on the loop. A running thread cannot be interrupted, so a timed-out sync tool
+has its statement time limited by the database (where supported) and its
+uncommitted work rolled back when it finishes; a call still queued is not
+started at all. Several built-in write tools commit inside the function, so
+a rollback cannot undo them: tools with side effects are never timed out or
+abandoned and always run to completion, so the model is never told a write
+failed that actually landed.
+
+Configuration (site_config.json):
+    huf_tool_workers: pool size per process (default 8)
+    huf_tool_timeout: default timeout in seconds for tools without side
+        effects (default: none)
+    huf_tool_thread_pool: set to 0 to run sync tools inline on the loop
+"""
+
+import asyncio
+import threading
+from concurrent.futures import ThreadPoolExecutor
+
+import frappe
+
+DEFAULT_TOOL_WORKERS = 8
+
+_executor = None
+_executor_lock = threading.Lock()
+
+
+class ToolTimeoutError(Exception):
+    pass
+
+
+def get_tool_timeout(timeout=None, side_effects=False):
+    """
+    Timeout in seconds for a tool call, or None to wait for it.
+
+    The site default applies when the tool sets none. Tools with side effects
+    are never timed out: their writes may already be committed.
+    """
+    if side_effects:
+        return None
+    timeout = timeout or frappe.conf.get("huf_tool_timeout")
+    return int(timeout) if timeout else None
+
+
+def use_thread_pool():
+    # Tests run inside one uncommitted transaction a pooled connection cannot see
+    if frappe.flags.in_test:
+        return False
+    return bool(int(frappe.conf.get("huf_tool_thread_pool", 1)))
+
+
+def get_tool_executor():
+    global _executor
+    if _executor is None:
+        with _executor_lock:
+            if _executor is None:
+                _executor = ThreadPoolExecutor(
+                    max_workers=int(frappe.conf.get("huf_tool_workers") or DEFAULT_TOOL_WORKERS),
+                    thread_name_prefix="huf-tool",
+                )
+    return _executor
+
+
+async def run_async_tool(function, kwargs, timeout=None, side_effects=False):
+    """Await an async tool on the current loop, cancelling it on timeout."""
+    timeout = get_tool_timeout(timeout, side_effects)
+    if timeout is None:
+        return await function(**kwargs)
+    try:
+        return await asyncio.wait_for(function(**kwargs), timeout=timeout)
+    except asyncio.TimeoutError:
+        raise ToolTimeoutError(f"Tool {function.__name__} timed out after {timeout}s") from None
+
+
+async def run_sync_tool(function, kwargs, timeout=None, side_effects=False):
+    """
+    Run a sync tool in the worker pool and await its result.
+
+    Args:
+        function: Sync tool function
+        kwargs: Arguments to call it with
+        timeout: Seconds before the call is abandoned (site default when None)
+        side_effects: The tool writes data; it is never abandoned and its
+            work is committed even if the caller stops waiting
+
+    Returns:
+        The tool's return value
+    """
+    if not use_thread_pool():
+        return function(**kwargs)
+
+    timeout = get_tool_timeout(timeout, side_effects)
+    cancelled = threading.Event()
+    future = get_tool_executor().submit(
+        _run_in_site_context,
+        function,
+        kwargs,
+        site=frappe.local.site,
+        sites_path=frappe.local.sites_path,
+        user=frappe.session.user,
+        lang=getattr(frappe.local, "lang", None),
+        timeout=timeout,
+        cancelled=cancelled,
+    )
+
+    try:
+        return await asyncio.wait_for(asyncio.wrap_future(future), timeout=timeout)
+    except asyncio.TimeoutError:
+        cancelled.set()
+        raise ToolTimeoutError(f"Tool {function.__name__} timed out after {timeout}s") from None
+    except asyncio.CancelledError:
+        # A queued call is dropped by the cancelled future; a running write
+        # tool is left to finish and commit rather than half-apply
+        if not side_effects:
+            cancelled.set()
+        raise
+
+
+def _run_in_site_context(function, kwargs, site, sites_path, user, lang, timeout, cancelled):
+    """Pool thread: run one tool call in its own Frappe context and transaction."""
+    if cancelled.is_set():
+        return None
+
+    frappe.init(site=site, sites_path=sites_path)
+    try:
+        frappe.connect()
+        frappe.set_user(user)
+        if lang:
+            frappe.local.lang = lang
+        if timeout and hasattr(frappe.db, "set_execution_timeout"):
+            frappe.db.set_execution_timeout(timeout)
+
+        try:
+            result = function(**kwargs)
+        except Exception:
+            frappe.db.rollback()
+            raise
+
+        if hasattr(result, "as_dict"):
+            # Documents need the site context to serialize
+            result = result.as_dict()
+
+        if cancelled.is_set():
+            # Caller gave up on this read-only call; drop anything it left open
+            frappe.db.rollback()
+            return None
+
+        frappe.db.commit()
+        return result
+    finally:
+        frappe.destroy()
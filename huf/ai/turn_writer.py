@@ -0,0 +1,175 @@
+import json
+
+import frappe
+from frappe.utils import now_datetime
+
+from .conversation_manager import reserve_message_indexes
+
+
+class TurnWriter:
+    """
+    Write-behind persistence for one agent turn.
+
+    Tool calls, messages and run metrics are collected in memory and written
+    with bulk inserts in a single transaction when the turn ends (or every
+    `flush_every` items). Realtime events queued with publish() are emitted
+    after the flush, so clients never see ids that are not committed yet.
+    """
+
+    def __init__(self, conversation, run_name, session_id, user=None, flush_every=50):
+        self.conversation = conversation
+        self.run_name = run_name
+        self.session_id = session_id
+        self.user = user or frappe.session.user
+        self.flush_every = flush_every
+
+        self._tool_calls = {}      # name -> row dict (pending insert)
+        self._messages = {}        # name -> row dict (pending insert)
+        self._flushed_updates = [] # (doctype, name, values) for rows already written
+        self._pending_calls = []   # tool call names awaiting output, in request order
+        self._call_ids = {}        # provider call id -> tool call name
+        self._call_messages = {}   # tool call name -> message name
+        self._run_values = {}
+        self._events = []
+
+    def add_tool_call(self, tool, args=None, call_id=None, is_mcp_tool=0, mcp_server=None):
+        """Queue an Agent Tool Call in status Queued; returns its name."""
+        name = frappe.generate_hash(length=10)
+        self._tool_calls[name] = {
+            "agent_run": self.run_name,
+            "conversation": self.conversation.name,
+            "tool": tool,
+            "is_mcp_tool": is_mcp_tool,
+            "mcp_server": mcp_server,
+            "tool_args": json.dumps(args) if args else None,
+            "tool_result": None,
+            "error_message": None,
+            "status": "Queued",
+            "call_id": call_id,
+        }
+        self._pending_calls.append(name)
+        if call_id:
+            self._call_ids[call_id] = name
+        self._maybe_flush()
+        return name
+
+    def complete_tool_call(self, call_id=None, result=None, error=None):
+        """Record the output of the matching queued tool call; returns (name, row values)."""
+        name = self._call_ids.pop(call_id, None) if call_id else None
+        if not name and self._pending_calls:
+            name = self._pending_calls[0]
+        if not name:
+            return None, None
+        if name in self._pending_calls:
+            self._pending_calls.remove(name)
+
+        values = {
+            "tool_result": json.dumps(result) if result is not None else None,
+            "status": "Failed" if error else "Completed",
+            "error_message": error or None,
+        }
+        self._update("Agent Tool Call", name, values)
+        row = self._tool_calls.get(name) or frappe.db.get_value(
+            "Agent Tool Call", name, ["tool", "status", "error_message"], as_dict=True
+        )
+        return name, {**row, **values}
+
+    def add_message(self, role, content, provider, model, agent, kind="Message", tool_call_id=None):
+        """Queue an Agent Message; returns its name."""
+        name = frappe.generate_hash(length=10)
+        self._messages[name] = {
+            "conversation": self.conversation.name,
+            "role": role,
+            "content": content if isinstance(content, str) else json.dumps(content),
+            "user": self.user if role == "user" else "Agent",
+            "session_id": self.session_id,
+            "kind": kind,
+            "agent_run": self.run_name,
+            "agent": agent,
+            "provider": provider,
+            "model": model,
+            "is_agent_message": 1 if role == "agent" else 0,
+            "tool_calll": tool_call_id,
+        }
+        if tool_call_id:
+            self._call_messages[tool_call_id] = name
+        self._maybe_flush()
+        return name
+
+    def get_tool_call_message(self, tool_call_name):
+        """Name of the message created for a tool call, if any."""
+        return self._call_messages.get(tool_call_name) or frappe.db.get_value(
+            "Agent Message", {"tool_calll": tool_call_name}, "name"
+        )
+
+    def append_tool_result(self, message_name, result_str):
+        """Append a tool result to its tool call message and mark it as a result."""
+        row = self._messages.get(message_name)
+        content = row["content"] if row else frappe.db.get_value("Agent Message", message_name, "content")
+        self._update("Agent Message", message_name, {
+            "content": (content or "") + f"\n\n**Tool Result:**\n{result_str}",
+            "kind": "Tool Result",
+        })
+
+    def set_run_values(self, **values):
+        self._run_values.update(values)
+
+    def publish(self, message):
+        """Queue a realtime event on the conversation channel, emitted after flush."""
+        self._events.append(message)
+
+    def flush(self):
+        """Write everything collected so far in one transaction and emit queued events."""
+        now = now_datetime()
+        owner = frappe.session.user
+
+        if self._tool_calls:
+            self._bulk_insert("Agent Tool Call", self._tool_calls, now, owner)
+            self._tool_calls = {}
+
+        if self._messages:
+            first_index = reserve_message_indexes(self.conversation.name, len(self._messages))
+            for offset, row in enumerate(self._messages.values()):
+                row["conversation_index"] = first_index + offset
+            self._bulk_insert("Agent Message", self._messages, now, owner)
+            self._messages = {}
+
+        for doctype, name, values in self._flushed_updates:
+            frappe.db.set_value(doctype, name, values)
+        self._flushed_updates = []
+
+        if self._run_values:
+            frappe.db.set_value("Agent Run", self.run_name, self._run_values, update_modified=True)
+            self._run_values = {}
+
+        from huf.ai.agent_integration import safe_commit
+        safe_commit()
+
+        for message in self._events:
+            frappe.publish_realtime(
+                event=f"conversation:{self.conversation.name}",
+                message=message,
+                user=frappe.session.user,
+            )
+        self._events = []
+
+    def _update(self, doctype, name, values):
+        pending = self._tool_calls if doctype == "Agent Tool Call" else self._messages
+        if name in pending:
+            pending[name].update(values)
+        else:
+            self._flushed_updates.append((doctype, name, values))
+
+    def _maybe_flush(self):
+        if len(self._tool_calls) + len(self._messages) >= self.flush_every:
+            self.flush()
+
+    @staticmethod
+    def _bulk_insert(doctype, rows, now, owner):
+        fields = ["name", "creation", "modified", "owner", "modified_by", "docstatus"]
+        columns = list(next(iter(rows.values())))
+        values = [
+            [name, now, now, owner, owner, 0] + [row.get(c) for c in columns]
+            for name, row in rows.items()
+        ]
+        frappe.db.bulk_insert(doctype, fields + columns, values)
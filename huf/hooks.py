@@ -183,6 +183,34 @@ doc_events = {
         "on_update": "huf.ai.agent_hooks.clear_doc_event_agents_cache",
         "on_trash": "huf.ai.agent_hooks.clear_doc_event_agents_cache",
     },
+    "Agent": {
+        "on_update": [
+            "huf.ai.agent_cache.publish_agent_cache_invalidation",
+            "huf.ai.response_cache.clear_agent_response_cache",
+        ],
+        "on_trash": [
+            "huf.ai.agent_cache.publish_agent_cache_invalidation",
+            "huf.ai.response_cache.clear_agent_response_cache",
+        ],
+    },
+    "Agent Tool Function": {
+        "on_update": "huf.ai.agent_cache.publish_agent_cache_invalidation",
+        "on_trash": "huf.ai.agent_cache.publish_agent_cache_invalidation",
+    },
+    "MCP Server": {
+        "on_update": [
+            "huf.ai.agent_cache.publish_agent_cache_invalidation",
+            "huf.ai.mcp_pool.invalidate_mcp_server_config",
+        ],
+        "on_trash": [
+            "huf.ai.agent_cache.publish_agent_cache_invalidation",
+            "huf.ai.mcp_pool.invalidate_mcp_server_config",
+        ],
+    },
+    "AI Provider": {
+        "on_update": "huf.ai.agent_cache.publish_agent_cache_invalidation",
+        "on_trash": "huf.ai.agent_cache.publish_agent_cache_invalidation",
+    },
     "Knowledge Source": {
         "after_insert": "huf.ai.knowledge.hooks.on_knowledge_source_created",
         "on_update": "huf.ai.knowledge.hooks.on_knowledge_source_updated",
@@ -224,6 +252,9 @@ scheduler_events = {
     "cron": {
         "*/1 * * * *": [
             "huf.ai.orchestration.scheduler.process_orchestrations"
+        ],
+        "*/5 * * * *": [
+            "huf.ai.run_analytics.update_run_rollups"
         ]
     },
     "hourly": [
@@ -1,9 +1,51 @@
 # Copyright (c) 2025, Tridz Technologies Pvt Ltd and Contributors
 # See license.txt
 
-# import frappe
+from types import SimpleNamespace
+from unittest.mock import patch
+
+import frappe
 from frappe.tests.utils import FrappeTestCase
 
+from huf.ai.agent_integration import run_agent_sync
+
+TEST_PROVIDER = "_Test Huf Provider"
+TEST_MODEL = "_test-huf-model"
+TEST_AGENT = "_Test Huf Sync Agent"
+
+
+def create_test_agent():
+	if not frappe.db.exists("AI Provider", TEST_PROVIDER):
+		frappe.get_doc({"doctype": "AI Provider", "provider_name": TEST_PROVIDER, "api_key": "test"}).insert()
+	if not frappe.db.exists("AI Model", TEST_MODEL):
+		frappe.get_doc({"doctype": "AI Model", "model_name": TEST_MODEL, "provider": TEST_PROVIDER}).insert()
+	if not frappe.db.exists("Agent", TEST_AGENT):
+		frappe.get_doc({
+			"doctype": "Agent",
+			"agent_name": TEST_AGENT,
+			"provider": TEST_PROVIDER,
+			"model": TEST_MODEL,
+			"instructions": "Answer briefly.",
+		}).insert()
+
+
+async def fake_run(agent, prompt, provider, model, context=None):
+	return SimpleNamespace(final_output='{"answer": 4}', new_items=[], usage=None, cost=0)
+
 
 class TestAgent(FrappeTestCase):
-	pass
+	def setUp(self):
+		create_test_agent()
+
+	@patch("huf.ai.knowledge.context_builder.build_knowledge_context", return_value=None)
+	@patch("huf.ai.agent_integration.RunProvider.run", fake_run)
+	@patch("huf.ai.agent_integration.get_compiled_agent", return_value=SimpleNamespace(tools=[]))
+	def test_run_agent_sync_result(self, *mocks):
+		result = run_agent_sync(TEST_AGENT, prompt="What is 2 + 2?")
+
+		self.assertTrue(result["success"], result.get("error"))
+		self.assertEqual(result["response"], '{"answer": 4}')
+		self.assertEqual(result["structured"], {"answer": 4})
+		self.assertEqual(result["provider"], TEST_PROVIDER)
+		self.assertEqual(frappe.db.get_value("Agent Run", result["agent_run_id"], "status"), "Success")
+		self.assertTrue(result["conversation_id"])
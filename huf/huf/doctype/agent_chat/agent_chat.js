@@ -322,13 +322,19 @@ function do_send(frm, msg, textarea, messagesEl) {
             if (done) break;
 
             buffer += decoder.decode(value, { stream: true });
-            const lines = buffer.split('\n\n');
-            buffer = lines.pop(); // Keep incomplete line
+            const events = buffer.split('\n\n');
+            buffer = events.pop(); // Keep incomplete event
 
-            for (const line of lines) {
-                if (line.startsWith('data: ')) {
+            for (const event of events) {
+                // An event block may carry other fields (e.g. `id:`) and comments
+                // besides its data lines; only the data is used here
+                const dataLines = event.split('\n')
+                    .filter(field => field.startsWith('data:'))
+                    .map(field => field.slice(5).replace(/^ /, ''));
+
+                if (dataLines.length) {
                     try {
-                        const data = JSON.parse(line.slice(6));
+                        const data = JSON.parse(dataLines.join('\n'));
 
                         if (data.type === 'delta') {
                             const text = data.content || '';
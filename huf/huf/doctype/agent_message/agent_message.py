@@ -1,9 +1,15 @@
 # Copyright (c) 2025, Tridz Technologies Pvt Ltd and contributors
 # For license information, please see license.txt
 
-# import frappe
+import frappe
 from frappe.model.document import Document
 
 
 class AgentMessage(Document):
 	pass
+
+
+def on_doctype_update():
+	frappe.db.add_index(
+		"Agent Message", ["conversation", "conversation_index"], "conversation_conversation_index_index"
+	)
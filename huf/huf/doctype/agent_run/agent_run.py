@@ -1,9 +1,18 @@
 # Copyright (c) 2025, Tridz Technologies Pvt Ltd and contributors
 # For license information, please see license.txt
 
-# import frappe
+import frappe
 from frappe.model.document import Document
 
 
 class AgentRun(Document):
-	pass
+	def after_delete(self):
+		# Rollups only find changed runs by `modified`; deleted ones must be flagged
+		from huf.ai.run_analytics import mark_rollup_stale
+
+		mark_rollup_stale(self.start_time)
+
+
+def on_doctype_update():
+	# Range scans by start_time when rebuilding run rollups
+	frappe.db.add_index("Agent Run", ["start_time"])
@@ -0,0 +1,8 @@
+// Copyright (c) 2025, Tridz Technologies Pvt Ltd and contributors
+// For license information, please see license.txt
+
+// frappe.ui.form.on("Agent Run Rollup", {
+// 	refresh(frm) {
+
+// 	},
+// });
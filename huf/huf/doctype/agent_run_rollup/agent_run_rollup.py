@@ -0,0 +1,15 @@
+# Copyright (c) 2025, Tridz Technologies Pvt Ltd and contributors
+# For license information, please see license.txt
+
+import frappe
+from frappe.model.document import Document
+
+
+class AgentRunRollup(Document):
+	pass
+
+
+def on_doctype_update():
+	frappe.db.add_index(
+		"Agent Run Rollup", ["period", "period_start", "agent"], "period_period_start_agent_index"
+	)
@@ -0,0 +1,86 @@
+# Copyright (c) 2025, Tridz Technologies Pvt Ltd and Contributors
+# See license.txt
+
+import json
+
+import frappe
+from frappe.tests.utils import FrappeTestCase
+from frappe.utils import add_to_date, now_datetime
+
+from huf.ai.run_analytics import WATERMARK_KEY, update_run_rollups
+from huf.huf.doctype.agent.test_agent import TEST_AGENT, create_test_agent
+
+
+class TestAgentRunRollup(FrappeTestCase):
+	def setUp(self):
+		create_test_agent()
+		self.hour = add_to_date(now_datetime(), days=-3).replace(minute=0, second=0, microsecond=0)
+		self.day = self.hour.replace(hour=0)
+		self.runs = []
+		frappe.db.set_global(WATERMARK_KEY, None)
+
+	def tearDown(self):
+		for name in self.runs:
+			frappe.db.delete("Agent Run", name)
+		frappe.db.delete("Agent Run Rollup", {"agent": TEST_AGENT})
+		frappe.db.commit()
+
+	def make_run(self, minute, seconds, status="Success", hour=None):
+		start = add_to_date(hour or self.hour, minutes=minute)
+		run = frappe.get_doc({
+			"doctype": "Agent Run",
+			"agent": TEST_AGENT,
+			"status": status,
+			"start_time": start,
+			"end_time": add_to_date(start, seconds=seconds),
+			"input_tokens": 100,
+			"output_tokens": 10,
+			"cost": 0.5,
+		}).insert(ignore_permissions=True)
+		self.runs.append(run.name)
+		return run
+
+	def get_rollup(self, period, period_start):
+		rows = frappe.get_all(
+			"Agent Run Rollup",
+			filters={"period": period, "period_start": period_start, "agent": TEST_AGENT},
+			fields=["*"],
+		)
+		self.assertEqual(len(rows), 1)
+		return rows[0]
+
+	def test_hourly_and_daily_rollups(self):
+		# Durations land in the (0.25, 0.5], (1, 2], (1, 2] and (8, 13] buckets
+		self.make_run(1, 0.5)
+		self.make_run(2, 1.5)
+		self.make_run(3, 1.8, status="Failed")
+		self.make_run(4, 10)
+		later_hour = add_to_date(self.hour, hours=1) if self.hour.hour < 23 else add_to_date(self.hour, hours=-1)
+		self.make_run(5, 0.5, hour=later_hour)
+
+		update_run_rollups()
+
+		hourly = self.get_rollup("Hourly", self.hour)
+		self.assertEqual(hourly.total_runs, 4)
+		self.assertEqual(hourly.success_runs, 3)
+		self.assertEqual(hourly.failed_runs, 1)
+		self.assertEqual(hourly.input_tokens, 400)
+		self.assertAlmostEqual(hourly.total_cost, 2.0)
+		self.assertAlmostEqual(hourly.total_duration, 13.8)
+		# p50: rank 2 is halfway through the (1, 2] bucket; p95: rank 3.8 is 80% into (8, 13]
+		self.assertAlmostEqual(hourly.p50_duration, 1.5)
+		self.assertAlmostEqual(hourly.p95_duration, 12.0)
+
+		daily = self.get_rollup("Daily", self.day)
+		self.assertEqual(daily.total_runs, 5)
+		self.assertEqual(daily.output_tokens, 50)
+		self.assertEqual(sum(json.loads(daily.duration_histogram)), 5)
+		# rank 2.5 of 5 is a quarter into the (1, 2] bucket once both hours are merged
+		self.assertAlmostEqual(daily.p50_duration, 1.25)
+		self.assertTrue(frappe.db.get_global(WATERMARK_KEY))
+
+		# A deleted run is subtracted on the next refresh even though nothing else changed
+		frappe.delete_doc("Agent Run", self.runs[-2], ignore_permissions=True)
+		update_run_rollups()
+		self.assertEqual(self.get_rollup("Hourly", self.hour).total_runs, 3)
+		self.assertEqual(self.get_rollup("Daily", self.day).total_runs, 4)
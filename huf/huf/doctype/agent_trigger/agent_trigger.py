@@ -6,6 +6,10 @@ from frappe.model.document import Document
 from frappe.utils.safe_exec import get_safe_globals, safe_eval
 from frappe import _
 
+# Coalesced batches are reloaded by name after commit, so events where the name
+# is not set yet, still the old one, or gone by then always run per document.
+NON_COALESCIBLE_EVENTS = ("before_insert", "before_rename", "on_trash", "after_delete")
+
 
 def get_context(doc):
 	return {"doc": frappe._dict(doc), **get_safe_globals()}
@@ -20,6 +24,8 @@ class AgentTrigger(Document):
 			frappe.throw(_("Reference Doctype and Doc Event are required for Doc Event triggers."))
 		if self.trigger_type == "Schedule" and not self.scheduled_interval:
 			frappe.throw(_("Scheduled Interval is required for Schedule triggers."))
+		if self.trigger_type == "Doc Event" and self.coalesce_events and self.doc_event in NON_COALESCIBLE_EVENTS:
+			frappe.throw(_("Events cannot be coalesced for {0}: the document is looked up by name after commit.").format(self.doc_event))
 
 	
 
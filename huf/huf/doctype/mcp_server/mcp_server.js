@@ -35,9 +35,32 @@ frappe.ui.form.on("MCP Server", {
                     }
                 });
             }, __("Actions"));
+
+            if ((frm.doc.tools || []).some((tool) => tool.cacheable)) {
+                frm.events.show_cache_stats(frm);
+            }
         }
     },
 
+    show_cache_stats(frm) {
+        frappe.call({
+            method: "huf.ai.mcp_result_cache.get_cache_stats",
+            args: {
+                server_name: frm.doc.name
+            },
+            callback: function (r) {
+                if (!r.message) return;
+                const stats = r.message;
+                frm.dashboard.add_indicator(
+                    __("Result Cache: {0} hits / {1} misses ({2}%)", [
+                        stats.hits, stats.misses, stats.hit_rate.toFixed(1)
+                    ]),
+                    stats.hits ? "green" : "gray"
+                );
+            }
+        });
+    },
+
     sync_tools_button(frm) {
         frm.events.sync_tools(frm);
     },
@@ -11,6 +11,12 @@ class MCPServer(Document):
         if self.auth_type and self.auth_type != "none":
             if not self.auth_header_name:
                 frappe.throw("Auth Header Name is required when authentication is enabled")
+
+        for tool in self.tools:
+            if tool.cacheable and tool.has_side_effects:
+                frappe.throw(f"Row {tool.idx}: Tool {tool.tool_name} has side effects and cannot be cached")
+            if tool.cacheable and (tool.cache_ttl or 0) <= 0:
+                frappe.throw(f"Row {tool.idx}: Cache TTL must be greater than 0 for cacheable tool {tool.tool_name}")
     
     def before_save(self):
         """Format auth header based on auth type"""
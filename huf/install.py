@@ -12,6 +12,9 @@ def after_install():
     create_demo_ai_providers()
     create_demo_ai_models()
     create_image_generation_tool()
+    # Patches are marked as applied on install, so add the indexes here too
+    from huf.patches.v1.add_hot_path_indexes import execute as add_hot_path_indexes
+    add_hot_path_indexes()
     frappe.db.commit()
     """
 	Called after app installation.
@@ -0,0 +1,29 @@
+import frappe
+
+# Composite indexes matching the filters used on the hot paths:
+# conversation_manager, agent_integration, turn_writer, agent_scheduler,
+# agent_hooks and knowledge_input. Column order follows the equality
+# filters first, then the range/sort column.
+HOT_PATH_INDEXES = [
+    ("Agent Message", ["conversation", "conversation_index"]),
+    ("Agent Message", ["tool_calll"]),
+    ("Agent Message", ["conversation", "agent_run", "kind"]),
+    ("Agent Tool Call", ["agent_run", "status", "call_id"]),
+    ("Agent Run", ["agent", "start_time"]),
+    ("Agent Conversation", ["agent", "session_id", "is_active"]),
+    ("MCP Server Tool", ["tool_name", "enabled"]),
+    ("Agent Trigger", ["trigger_type", "disabled", "next_execution"]),
+    ("Knowledge Input", ["knowledge_source", "source_hash"]),
+]
+
+
+def get_index_name(fields):
+    return "_".join(fields) + "_index"
+
+
+def execute():
+    for doctype, fields in HOT_PATH_INDEXES:
+        if not frappe.db.table_exists(doctype):
+            continue
+        # add_index is a no-op when an index with this name already exists
+        frappe.db.add_index(doctype, fields, get_index_name(fields))
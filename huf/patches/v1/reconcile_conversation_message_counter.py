@@ -0,0 +1,15 @@
+import frappe
+
+def execute():
+    # total_messages is now the sequence counter for conversation_index;
+    # make sure it is never behind the highest index already stored
+    frappe.db.sql("""
+        UPDATE `tabAgent Conversation` c
+        JOIN (
+            SELECT conversation, MAX(conversation_index) AS last_index
+            FROM `tabAgent Message`
+            GROUP BY conversation
+        ) m ON m.conversation = c.name
+        SET c.total_messages = m.last_index
+        WHERE COALESCE(c.total_messages, 0) < m.last_index
+    """)